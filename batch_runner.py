@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import resources
+import metrics
+import prompts
+from lang_detect import detect_language
+from retrieval import pack_context, search_many
+from gemini_scheduler import BATCH, GeminiScheduler
+
+# Batch question answering: re-answer a JSONL file of FAQ/regression questions after a docs update.
+#   python batch_runner.py questions.jsonl answers.jsonl
+# Input lines: {"id": "faq-1", "question": "...", "lang": "en"}  (id and lang optional)
+# Output lines are appended as answers complete; rerunning the same command skips ids already
+# answered, so a crashed or interrupted run resumes where it stopped. Gemini calls go through the
+# shared scheduler at batch priority (rate limits, retries; see gemini_scheduler.py).
+EMBED_BATCH_SIZE = 64         # Questions embedded and searched together
+MAX_CONCURRENT_CALLS = 4      # Gemini requests in flight
+GEMINI_TIMEOUT_SECONDS = 600  # Per question, including queueing behind rate limits and retries
+CONTEXT_TOKEN_BUDGET = 1200
+FETCH_K = 8
+
+def read_queries(path):
+    """Yield {"id", "question", "lang"} per non-empty input line; ids default to the line number."""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping line {number} of {path}: {e}")
+                continue
+            if isinstance(item, str):
+                item = {"question": item}
+            question = (item.get("question") or item.get("query") or "").strip()
+            if not question:
+                print(f"⚠️ Skipping line {number} of {path}: no question")
+                continue
+            yield {"id": str(item.get("id", number)), "question": question, "lang": item.get("lang")}
+
+def answered_ids(path):
+    """Ids already answered successfully in an existing output file (a torn last line is ignored)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if row.get("status") == "ok":
+                done.add(row["id"])
+    return done
+
+def _end_torn_line(path):
+    """Terminate a last line cut off by a crash, so the next appended row starts on its own line."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def prepare_batch(batch, vectorstore, embeddings, site, count_tokens):
+    """Embed, search and build prompts for one batch of questions (one embedding call, one FAISS search).
+    With the whole corpus in Gemini's context cache (GEMINI_PROMPT_CACHE=corpus) only the questions
+    are sent, so nothing is searched."""
+    from chatbot_rag import build_qa_prompt, cached_prefix_model, format_source
+    model = cached_prefix_model("qa", site)
+    if model is not None and resources.PROMPT_CACHE_CORPUS:
+        for item in batch:
+            lang = item["lang"] or detect_language(item["question"])
+            item.update(lang=lang, prompt=prompts.qa_suffix(item["question"], lang), model=model, sources=[],
+                        timings={"embed_s": 0.0, "search_s": 0.0, "pack_s": 0.0})
+        return batch
+    start = time.perf_counter()
+    with metrics.stage("batch_embed"):
+        vectors = embeddings.embed_documents([item["question"] for item in batch])
+    embed_s = (time.perf_counter() - start) / len(batch)
+    start = time.perf_counter()
+    with metrics.stage("batch_faiss_search"):
+        all_hits = search_many(vectorstore, vectors, FETCH_K)
+    search_s = (time.perf_counter() - start) / len(batch)
+    for item, hits in zip(batch, all_hits):
+        start = time.perf_counter()
+        lang = item["lang"] or detect_language(item["question"])
+        context, docs = pack_context(hits, CONTEXT_TOKEN_BUDGET, count_tokens)
+        prompt = (prompts.qa_suffix(item["question"], lang, context) if model is not None
+                  else build_qa_prompt(item["question"], context, site, lang))
+        item.update(lang=lang, prompt=prompt, model=model,
+                    sources=list(dict.fromkeys(format_source(d.metadata) for d in docs if "source" in d.metadata)),
+                    timings={"embed_s": embed_s, "search_s": search_s, "pack_s": time.perf_counter() - start})
+    return batch
+
+def answer(item, model, scheduler, count_tokens, timeout=GEMINI_TIMEOUT_SECONDS):
+    """Call Gemini for one prepared question (stateless, no chat history) and return the output row."""
+    row = {"id": item["id"], "question": item["question"], "lang": item["lang"], "sources": item["sources"]}
+    start = time.perf_counter()
+    response = text = None
+
+    def attempt(time_left):
+        return (item["model"] or model).generate_content(item["prompt"], request_options={"timeout": time_left})
+    try:
+        with metrics.stage("batch_gemini"):
+            response = scheduler.call(attempt, priority=BATCH, timeout=timeout, tokens=count_tokens(item["prompt"]))
+        text = response.text
+    except Exception as e:
+        metrics.inc("gemini_errors_total")
+        row.update(status="error", error=str(e))
+    gemini_s = time.perf_counter() - start
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        tokens = {"prompt": usage.prompt_token_count, "response": usage.candidates_token_count,
+                  "cached": getattr(usage, "cached_content_token_count", 0) or 0, "estimated": False}
+    else:
+        tokens = {"prompt": count_tokens(item["prompt"]), "response": count_tokens(text or ""), "estimated": True}
+    if text is not None:
+        row.update(status="ok", answer=text)
+    timings = dict(item["timings"], gemini_s=gemini_s)
+    timings["total_s"] = sum(timings.values())
+    row.update(timings=timings, tokens=tokens)
+    metrics.inc("prompt_tokens_total", tokens["prompt"] or 0)
+    metrics.inc("response_tokens_total", tokens["response"] or 0)
+    return row
+
+def run_batch(input_path, output_path, concurrency=MAX_CONCURRENT_CALLS, requests_per_minute=None,
+              batch_size=EMBED_BATCH_SIZE, limit=None):
+    """Answer every question in input_path not yet answered in output_path. Returns (ok, errors).
+    requests_per_minute overrides GEMINI_RPM for this process."""
+    from chatbot_rag import fetch_website_summary
+    vectorstore = resources.get_vectorstore()
+    if vectorstore is None:
+        raise SystemExit("❌ FAISS index not found; build it with python vector_store.py first.")
+    if requests_per_minute:
+        resources.override(scheduler=GeminiScheduler(requests_per_minute=requests_per_minute))
+    embeddings, model, scheduler = resources.get_embeddings(), resources.get_model(), resources.get_scheduler()
+    count_tokens = resources.get_token_counter()
+    site = fetch_website_summary()
+    done = answered_ids(output_path)
+    todo = (item for item in read_queries(input_path) if item["id"] not in done)
+    if limit:
+        todo = (item for _, item in zip(range(limit), todo))
+    if done:
+        print(f"⏩ Resuming: {len(done)} questions already answered in {output_path}")
+    ok = errors = 0
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    _end_torn_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+
+        def collect(futures):
+            nonlocal ok, errors
+            for future in futures:
+                row = future.result()
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                out.flush()  # Each finished answer survives a crash
+                if row["status"] == "ok":
+                    ok += 1
+                else:
+                    errors += 1
+                    print(f"❌ {row['id']}: {row['error']}")
+                if (ok + errors) % 25 == 0:
+                    print(f"… {ok + errors} done ({errors} errors)")
+
+        for batch in _batches(todo, batch_size):
+            for item in prepare_batch(batch, vectorstore, embeddings, site, count_tokens):
+                # Bounded queue: never prepare far ahead of what Gemini can take
+                while len(pending) >= concurrency * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(pool.submit(answer, item, model, scheduler, count_tokens))
+        finished, _ = wait(pending)
+        collect(finished)
+    print(f"✅ Batch done: {ok} answered, {errors} errors → {output_path}")
+    return ok, errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help="JSONL with one {\"id\", \"question\", \"lang\"} per line")
+    parser.add_argument("output", help="JSONL results, appended; rerun to resume")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_CALLS)
+    parser.add_argument("--rpm", type=int, help="Gemini requests per minute (default: GEMINI_RPM or 60)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, help="answer at most this many new questions")
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.concurrency, args.rpm, args.batch_size, args.limit)
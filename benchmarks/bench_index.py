@@ -0,0 +1,123 @@
+"""FAISS index benchmark: recall@k against the flat index, query latency and index size.
+
+Uses the vectors of a built index (--index-dir, e.g. faiss_index) or synthetic clustered
+384-d vectors shaped like MiniLM embeddings. Queries are perturbed corpus vectors, so every
+query has close neighbours the way real questions do.
+
+    python benchmarks/bench_index.py --vectors 50000 --queries 500
+    python benchmarks/bench_index.py --index-dir faiss_index --output bench_results/index.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index_storage import (INDEX_FILE, INDEX_TYPES, build_ann_index, default_nlist,  # noqa: E402
+                           flat_vectors, read_faiss_index, set_search_params)
+
+# Index type -> query-time settings to sweep (each one is a point on the recall/latency curve)
+SWEEPS = {
+    "flat": [{}],
+    "ivf": [{"nprobe": p} for p in (1, 4, 8, 16, 32, 64)],
+    "hnsw": [{"efSearch": e} for e in (16, 32, 64, 128)],
+    "sq8": [{}],
+    "pq": [{}],
+    "ivfpq": [{"nprobe": p} for p in (8, 16, 32, 64)],
+}
+
+def synthetic_vectors(n, dim=384, clusters=200, seed=0):
+    """Normalised vectors around random topic centres (chunks of the same guide sit close together)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(vectors, n, noise=0.3, seed=1):
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), n)]
+    queries = picks + noise * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(picks.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+def index_bytes(index):
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+def query_latencies(index, queries, k):
+    """Per-query latency, one query at a time like the chatbot does."""
+    times, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        times.append(time.perf_counter() - start)
+        found.append(ids[0])
+    return times, np.array(found)
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def main():
+    import faiss
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index-dir", help="benchmark the vectors of this built index instead of synthetic ones")
+    parser.add_argument("--vectors", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=6, help="results per query (the chatbot uses 6)")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="comma-separated index types")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads while querying (1 = per-request serving)")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+    build_threads = faiss.omp_get_max_threads()
+
+    if args.index_dir:
+        vectors = flat_vectors(read_faiss_index(os.path.join(args.index_dir, INDEX_FILE), mmap=False))
+    else:
+        vectors = synthetic_vectors(args.vectors)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = make_queries(vectors, args.queries)
+    k = min(args.k, len(vectors))
+    truth = faiss.IndexFlatL2(vectors.shape[1])
+    truth.add(vectors)
+    _, truth_ids = truth.search(queries, k)
+    print(f"📐 {len(vectors)} vectors × {vectors.shape[1]} dims | {len(queries)} queries | "
+          f"k={k} | nlist={default_nlist(len(vectors))}")
+
+    results = []
+    for index_type in args.types.split(","):
+        faiss.omp_set_num_threads(build_threads)  # Training uses every core
+        start = time.perf_counter()
+        try:
+            index = build_ann_index(vectors, index_type)
+        except ValueError as e:
+            print(f"{index_type:>6}: skipped ({e})")
+            continue
+        build_s = time.perf_counter() - start
+        size = index_bytes(index)
+        faiss.omp_set_num_threads(args.threads)
+        for params in SWEEPS.get(index_type, [{}]):
+            set_search_params(index, **params)
+            times, found = query_latencies(index, queries, k)
+            row = {"index_type": index_type, "params": params, "recall": recall_at_k(found, truth_ids),
+                   "p50_ms": percentile(times, 50) * 1000, "p95_ms": percentile(times, 95) * 1000,
+                   "size_mb": size / 1e6, "build_s": build_s}
+            results.append(row)
+            label = " ".join(f"{n}={v}" for n, v in params.items())
+            print(f"{index_type:>6} {label:<12} recall@{k} {row['recall']:.3f} | "
+                  f"p50 {row['p50_ms']:.3f} ms p95 {row['p95_ms']:.3f} ms | "
+                  f"{row['size_mb']:.1f} MB | build {build_s:.2f}s")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "vectors": len(vectors), "results": results}, f, indent=2)
+        print(f"✅ Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Gemini scheduler benchmark with the fake model: mixed interactive and batch traffic,
+injected 429s, and a requests-per-minute limit.
+
+Reports per-priority latency (queue wait + retries + call), retries and how far actual
+throughput stays under the limit: the peak number of calls in any 60 s window must not
+exceed --rpm (short runs show a higher average rate from the initial burst).
+
+    python benchmarks/bench_scheduler.py --interactive 40 --batch 200 --rpm 600 --fail-every 10
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics  # noqa: E402
+from fakes import FakeAPIError, FakeGenerativeModel  # noqa: E402
+from gemini_scheduler import BATCH, INTERACTIVE, GeminiScheduler  # noqa: E402
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * (len(values) - 1)))] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interactive", type=int, default=40, help="interactive calls (spread over the run)")
+    parser.add_argument("--batch", type=int, default=200, help="batch calls (all queued at start)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Gemini latency (s)")
+    parser.add_argument("--fail-every", type=int, default=10, help="every Nth call returns 429 (0 = never)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="backoff base (s)")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    model = FakeGenerativeModel(latency=args.latency, answer_chunks=1, chunk_delay=0,
+                                fail_every=args.fail_every, error=FakeAPIError(429))
+    from gemini_scheduler import backoff_delay
+    scheduler = GeminiScheduler(workers=args.workers, requests_per_minute=args.rpm,
+                                backoff=lambda attempt: backoff_delay(attempt, base=args.backoff, cap=2.0))
+    latencies = {INTERACTIVE: [], BATCH: []}
+    errors = {INTERACTIVE: 0, BATCH: 0}
+    call_times = []
+    lock = threading.Lock()
+
+    def attempt(timeout):
+        with lock:
+            call_times.append(time.perf_counter())
+        return model.generate_content("prompt " * 50, request_options={"timeout": timeout})
+
+    def run(priority):
+        start = time.perf_counter()
+        try:
+            scheduler.call(attempt, priority=priority, tokens=100)
+        except Exception:
+            with lock:
+                errors[priority] += 1
+            return
+        with lock:
+            latencies[priority].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(BATCH,)) for _ in range(args.batch)]
+    for thread in threads:
+        thread.start()
+    expected_s = (args.batch + args.interactive) * 60.0 / args.rpm
+    for _ in range(args.interactive):
+        time.sleep(expected_s / max(1, args.interactive) / 2)
+        thread = threading.Thread(target=run, args=(INTERACTIVE,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    scheduler.shutdown()
+
+    counters = metrics.snapshot()["counters"]
+    call_times.sort()
+    peak = max((bisect.bisect_left(call_times, t + 60.0) - i for i, t in enumerate(call_times)), default=0)
+    results = {"elapsed_s": elapsed, "calls": model.calls, "achieved_rpm": model.calls / elapsed * 60,
+               "peak_calls_per_60s": peak, "limit_rpm": args.rpm, "retries": counters.get("gemini_retries_total", 0),
+               "rate_limited": counters.get("gemini_rate_limited_total", 0)}
+    for priority, name in ((INTERACTIVE, "interactive"), (BATCH, "batch")):
+        results[name] = {"ok": len(latencies[priority]), "errors": errors[priority],
+                         "p50_s": percentile(latencies[priority], 0.5), "p95_s": percentile(latencies[priority], 0.95)}
+        print(f"{name:>11}: {len(latencies[priority])} ok, {errors[priority]} errors | "
+              f"p50 {results[name]['p50_s'] * 1000:.0f} ms p95 {results[name]['p95_s'] * 1000:.0f} ms")
+    print(f"{model.calls} Gemini calls in {elapsed:.1f}s = {results['achieved_rpm']:.0f} rpm | "
+          f"peak {peak} calls in any 60 s window (limit {args.rpm}) | "
+          f"{results['retries']:g} retries after {results['rate_limited']:g} 429s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"✅ Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
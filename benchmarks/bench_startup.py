@@ -0,0 +1,80 @@
+"""Cold-start benchmark: import time of chatbot_rag and import-to-first-answer time.
+
+Each run is a fresh interpreter. Gemini is replaced by an in-process stub so only
+local startup work is measured (embedding model, FAISS index, imports). To compare
+before/after, point --repo at another checkout, e.g.
+
+    git worktree add /tmp/health-chatbot-base <commit>
+    python benchmarks/bench_startup.py --repo /tmp/health-chatbot-base
+    python benchmarks/bench_startup.py
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "BENCH_RESULT "
+
+CHILD = r'''
+import sys, time, json
+t0 = time.perf_counter()
+import chatbot_rag
+t_import = time.perf_counter() - t0
+
+class _Response:
+    usage_metadata = None
+    def __init__(self, text): self.text = text
+    def __iter__(self): yield self
+
+class _Chat:
+    def send_message(self, prompt, stream=False, **kwargs): return _Response("stub answer")
+
+class _Model:
+    def start_chat(self, history=None): return _Chat()
+
+chatbot_rag.save_chat = lambda *args: None  # Keep benchmark turns out of chat_logs/
+if hasattr(chatbot_rag, "chat"):
+    chatbot_rag.chat = _Chat()  # Older layout: module-level chat
+else:
+    import resources
+    resources.override(model=_Model(), answer_cache=None, prompt_cache=None)  # No stub answers in the real cache
+t1 = time.perf_counter()
+answer = chatbot_rag.central_chat_system(sys.argv[1], "en")
+t_first = time.perf_counter() - t1
+if answer != "stub answer":  # An error path is not a first answer
+    sys.exit(f"First answer failed: {answer!r}")
+print("BENCH_RESULT " + json.dumps({"import_s": t_import, "first_answer_s": t_first,
+                                    "import_to_first_answer_s": t_import + t_first}))
+'''
+
+def run_once(repo, question):
+    proc = subprocess.run([sys.executable, "-c", CHILD, question], cwd=repo,
+                          capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=repo))
+    for line in proc.stdout.splitlines():
+        if line.startswith(MARKER):
+            return json.loads(line[len(MARKER):])
+    raise RuntimeError(f"Benchmark child failed:\n{proc.stderr[-2000:]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repo", default=REPO_ROOT, help="checkout to measure (default: this one)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--question", default="How do I take the kit?")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    runs = [run_once(os.path.abspath(args.repo), args.question) for _ in range(args.runs)]
+    summary = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+    result = {"repo": os.path.abspath(args.repo), "runs": runs, "median": summary}
+    for key, value in summary.items():
+        print(f"{key:>26}: {value:.3f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Table reconstruction benchmark on synthetic OCR word boxes.
+
+Generates diet-log tables of increasing size with jitter, font-size variation and
+page skew, then reports reconstruction time and the share of cells recovered exactly.
+
+    python benchmarks/bench_table.py --sizes 100,1000,5000 --skew 3
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from table_reconstruction import reconstruct_table, table_rows  # noqa: E402
+
+FOODS = ["rice", "roti", "dal", "green tea", "kit dose", "salad", "milk", "poha", "apple", "curd", "2 eggs"]
+
+def synthetic_log(n_words, skew_deg=2.0, jitter=4, seed=0, pages=1):
+    """Word boxes for a diet-log table with about n_words words, plus the expected cell grid."""
+    rng = random.Random(seed)
+    cols = ["Day", "Breakfast", "Lunch", "Snack", "Dinner"]
+    n_rows = max(2, n_words // (len(cols) * 1.3 * pages))
+    words, expected = [], [cols]
+    angle = math.radians(skew_deg)
+    for page in range(pages):
+        table = [cols] + [[str(page * 1000 + r)] + [rng.choice(FOODS) for _ in cols[1:]] for r in range(int(n_rows))]
+        expected.extend(table[1:])
+        scale = rng.uniform(0.8, 1.3)  # Handwriting size per page
+        h = 24 * scale
+        for r, row in enumerate(table):
+            for c, cell in enumerate(row):
+                x = 40 + c * 200 * scale
+                for token in cell.split():
+                    w = 11 * scale * len(token)
+                    y = 60 + r * 2.2 * h
+                    px, py = x + rng.uniform(-jitter, jitter), y + rng.uniform(-jitter, jitter)
+                    corners = [(px, py), (px + w, py), (px + w, py + h), (px, py + h)]
+                    rotated = [[round(cx * math.cos(angle) - cy * math.sin(angle)),
+                                round(cx * math.sin(angle) + cy * math.cos(angle))] for cx, cy in corners]
+                    words.append({"text": token, "vertices": rotated, "page": page})
+                    x += w + 8 * scale
+    return words, expected
+
+def cell_accuracy(rows, expected):
+    total = sum(len(r) for r in expected)
+    hits = sum(1 for got, want in zip(rows, expected) for a, b in zip(got, want) if a == b)
+    return hits / total if total else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,5000", help="comma-separated word counts")
+    parser.add_argument("--skew", type=float, default=2.0, help="page rotation in degrees")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        words, expected = synthetic_log(size, args.skew, seed=size, pages=args.pages)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            table = reconstruct_table(words)
+            times.append(time.perf_counter() - start)
+        accuracy = cell_accuracy(table_rows(table), expected)
+        results.append({"words": len(words), "median_ms": statistics.median(times) * 1000,
+                        "cell_accuracy": accuracy})
+        print(f"{len(words):>6} words: {statistics.median(times) * 1000:8.2f} ms | cell accuracy {accuracy:.1%}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"✅ Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Offline stand-ins for Gemini, Google Vision and the embedding model.
+
+Each fake has configurable latency so benchmarks exercise the real pipeline
+code without network access or API spend.
+"""
+import time
+import hashlib
+import random
+from types import SimpleNamespace
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # Older langchain layout
+    Embeddings = object
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, response_tokens, cached_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = response_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + response_tokens
+
+class FakeAPIError(Exception):
+    """Looks like a google.api_core error to retry logic: carries the HTTP status in .code."""
+
+    def __init__(self, code=429, message="Resource has been exhausted (e.g. check quota)."):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeResponse:
+    """Mimics GenerateContentResponse: .text, .usage_metadata, iterable chunks when streamed."""
+
+    def __init__(self, text, usage, chunks=None, chunk_delay=0.0):
+        self.text = text
+        self.usage_metadata = usage
+        self._chunks = chunks or [text]
+        self._chunk_delay = chunk_delay
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield SimpleNamespace(text=chunk)
+
+class FakeChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, prompt, stream=False, **kwargs):
+        return self.model.generate_content(prompt, stream=stream)
+
+class FakeGenerativeModel:
+    """Returns a canned answer after `latency` seconds (time to first token when streaming),
+    then streams `answer_chunks` pieces `chunk_delay` seconds apart."""
+
+    def __init__(self, latency=0.05, answer="You are doing well. Avoid rice after 7 pm.", answer_chunks=8,
+                 chunk_delay=0.01, fail_every=0, error=None):
+        self.latency = latency
+        self.answer = answer
+        self.answer_chunks = answer_chunks
+        self.chunk_delay = chunk_delay
+        self.fail_every = fail_every
+        self.error = error or RuntimeError("fake Gemini failure")
+        self.calls = 0
+        self.prompts = []
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        self.prompts.append(prompt if isinstance(prompt, str) else str(prompt))
+        time.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise self.error
+        usage = FakeUsage(len(self.prompts[-1]) // 4, len(self.answer) // 4)
+        if not stream:
+            time.sleep(self.chunk_delay * self.answer_chunks)
+            return FakeResponse(self.answer, usage)
+        step = max(1, len(self.answer) // self.answer_chunks)
+        chunks = [self.answer[i:i + step] for i in range(0, len(self.answer), step)]
+        return FakeResponse(self.answer, usage, chunks, self.chunk_delay)
+
+class FakeCachedModel:
+    """A FakeGenerativeModel bound to a cached prefix: prompts are answered as prefix + prompt and
+    usage reports the prefix as cached tokens, like GenerativeModel.from_cached_content."""
+
+    def __init__(self, base, prefix):
+        self.base = base
+        self.prefix = prefix
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        response = self.base.generate_content(self.prefix + prompt, stream=stream, **kwargs)
+        response.usage_metadata.cached_content_token_count = len(self.prefix) // 4
+        return response
+
+class FakeContextCache:
+    """Local stand-in for Gemini context caching (prompts.PrefixCache backend)."""
+
+    def __init__(self, base_model, min_chars=0):
+        self.base_model = base_model
+        self.min_chars = min_chars  # Gemini rejects prefixes below a minimum token count
+        self.live = {}
+        self.finds = 0
+        self.created = 0
+        self.deleted = 0
+
+    def find(self, model_name, display_name):
+        self.finds += 1
+        return self.live.get(display_name)
+
+    def create(self, model_name, display_name, text, ttl):
+        if len(text) < self.min_chars:
+            raise ValueError(f"Cached content is too small ({len(text)} chars)")
+        self.created += 1
+        handle = SimpleNamespace(name=f"cachedContents/{self.created}", display_name=display_name, text=text)
+        self.live[display_name] = handle
+        return handle
+
+    def extend(self, handle, ttl):
+        pass
+
+    def delete(self, handle):
+        self.deleted += 1
+        self.live.pop(handle.display_name, None)
+
+    def model_for(self, handle):
+        return FakeCachedModel(self.base_model, handle.text)
+
+def _vertices(x, y, w, h):
+    return [SimpleNamespace(x=x, y=y), SimpleNamespace(x=x + w, y=y),
+            SimpleNamespace(x=x + w, y=y + h), SimpleNamespace(x=x, y=y + h)]
+
+def diet_log_annotations(rows=7, seed=0):
+    """Synthetic Vision text_annotations for a handwritten diet-log table."""
+    rng = random.Random(seed)
+    foods = ["rice", "roti", "dal", "tea", "kit", "salad", "milk", "poha", "apple", "curd"]
+    table = [["Day", "Breakfast", "Lunch", "Dinner"]]
+    for day in range(1, rows + 1):
+        table.append([str(day)] + [rng.choice(foods) for _ in range(3)])
+    words = []
+    for r, row in enumerate(table):
+        for c, cell in enumerate(row):
+            x = 40 + c * 180 + rng.randint(-6, 6)
+            y = 60 + r * 50 + rng.randint(-5, 5)
+            words.append(SimpleNamespace(description=cell, bounding_poly=SimpleNamespace(
+                vertices=_vertices(x, y, 12 * len(cell), 24))))
+    full = SimpleNamespace(description="\n".join(" ".join(row) for row in table),
+                           bounding_poly=SimpleNamespace(vertices=_vertices(0, 0, 800, 60 + 50 * len(table))))
+    return [full] + words
+
+class FakeVisionClient:
+    """Mimics ImageAnnotatorClient.text_detection / batch_annotate_images."""
+
+    def __init__(self, latency=0.2, rows=7):
+        self.latency = latency
+        self.rows = rows
+        self.calls = 0
+
+    def _annotate(self, content):
+        seed = int(hashlib.sha256(content or b"").hexdigest()[:8], 16)
+        return SimpleNamespace(text_annotations=diet_log_annotations(self.rows, seed),
+                               error=SimpleNamespace(message=""))
+
+    def text_detection(self, image=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._annotate(getattr(image, "content", b""))
+
+    def batch_annotate_images(self, requests=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        responses = [self._annotate(getattr(getattr(r, "image", None), "content", b"")) for r in requests or []]
+        return SimpleNamespace(responses=responses)
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hashed bag-of-words vectors (no model download), `latency` seconds per call."""
+
+    def __init__(self, dim=384, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text):
+        vec = [0.0] * self.dim
+        for word in text.lower().split():
+            h = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16)
+            vec[h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,205 @@
+"""Offline pipeline benchmark with fake Gemini, Vision and embedding backends.
+
+Drives load_docs_from_folder, create_faiss_index (full and incremental),
+central_chat_system (QA, streaming QA and image: flows) over synthetic corpora
+of increasing size, and saves throughput, per-stage p50/p95 and peak memory as JSON.
+
+    python benchmarks/run_benchmarks.py --sizes 10,40,160 --output bench_results/HEAD.json
+    python benchmarks/run_benchmarks.py --compare bench_results/old.json bench_results/new.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeEmbeddings, FakeGenerativeModel, FakeVisionClient  # noqa: E402
+
+WORDS = ("kit herbs dose water morning evening rice roti dal sugar salt walk sleep digestion hunger "
+         "weight fat tea milk fruit salad dinner lunch breakfast avoid allowed ayurvedic capsule "
+         "powder warm cold exercise week day rule tip customer support").split()
+QUESTIONS = ["How do I take the kit?", "Can I eat rice?", "Is tea allowed in the morning?",
+             "What should I avoid at dinner?", "How much water should I drink?", "Can I walk after lunch?"]
+
+def _sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+
+def make_corpus(folder, n_docs, seed=0):
+    """Write n_docs synthetic guides: mostly TXT, every third a CSV, every fifth a PDF if PyMuPDF is available."""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    for i in range(n_docs):
+        if i % 3 == 2:
+            with open(os.path.join(folder, f"faq_{i}.csv"), "w", encoding="utf-8") as f:
+                f.write("question,answer\n")
+                for _ in range(40):
+                    f.write(f"\"{_sentence(rng)}\",\"{_sentence(rng)}\"\n")
+        elif i % 5 == 4 and fitz is not None:
+            doc = fitz.open()
+            for _ in range(4):
+                page = doc.new_page()
+                page.insert_textbox(fitz.Rect(40, 40, 560, 800), " ".join(_sentence(rng) for _ in range(25)))
+            doc.save(os.path.join(folder, f"guide_{i}.pdf"))
+        else:
+            with open(os.path.join(folder, f"guide_{i}.txt"), "w", encoding="utf-8") as f:
+                f.write("\n\n".join(" ".join(_sentence(rng) for _ in range(6)) for _ in range(8)))
+
+def measure(fn, iterations=1):
+    """Run fn(i) iterations times; return wall time, throughput, per-stage quantiles and peak memory."""
+    import metrics
+    metrics.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(iterations):
+            fn(i)
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stages = {name: {"count": s["count"], "p50_s": s["p50"], "p95_s": s["p95"]}
+              for name, s in metrics.snapshot()["stages"].items()}
+    return {"iterations": iterations, "wall_s": wall, "throughput_per_s": iterations / wall if wall else 0.0,
+            "peak_python_mem_mb": peak / 2 ** 20, "stages": stages}
+
+def bench_size(n_docs, args, workdir):
+    import metrics
+    import resources
+    import chatbot_rag
+    from load_docs import load_docs_from_folder
+    from vector_store import create_faiss_index
+    from retrieval import estimate_tokens
+    from gemini_scheduler import GeminiScheduler
+
+    docs_dir = os.path.join(workdir, f"docs_{n_docs}")
+    index_dir = os.path.join(workdir, f"index_{n_docs}")
+    make_corpus(docs_dir, n_docs, seed=n_docs)
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    # Unlimited by default: fake calls are free, and GEMINI_RPM would make the results measure the limiter
+    scheduler = GeminiScheduler(requests_per_minute=args.gemini_rpm, tokens_per_minute=args.gemini_tpm)
+    resources.override(embeddings=embeddings, answer_cache=None, prompt_cache=None, token_counter=estimate_tokens,
+                       model=FakeGenerativeModel(latency=args.gemini_latency, chunk_delay=args.chunk_delay),
+                       vision_client=FakeVisionClient(latency=args.vision_latency), scheduler=scheduler)
+    chatbot_rag.fetch_website_summary = lambda: "Obesity Killer Kit is a 100% natural Ayurvedic solution."
+
+    def load(_):
+        with metrics.stage("doc_load"):
+            load_docs_from_folder(docs_dir)
+
+    def index_full(_):
+        with metrics.stage("index_build"):
+            create_faiss_index(docs_dir, index_dir, full_rebuild=True)
+
+    def index_incremental(i):
+        with open(os.path.join(docs_dir, "guide_0.txt"), "a", encoding="utf-8") as f:
+            f.write(f"\n\nUpdated tip {i}: drink warm water.")
+        with metrics.stage("index_build"):
+            create_faiss_index(docs_dir, index_dir)
+
+    results = {"docs": n_docs,
+               "load_docs": measure(load),
+               "index_full": measure(index_full),
+               "index_incremental": measure(index_incremental, 3)}
+
+    from index_storage import load_vectorstore
+    resources.override(vectorstore=load_vectorstore(index_dir, embeddings))
+
+    def qa(i):
+        chatbot_rag.central_chat_system(QUESTIONS[i % len(QUESTIONS)], "en", session_id=f"bench-{i}")
+
+    def qa_stream(i):
+        for _ in chatbot_rag.central_chat_system_stream(QUESTIONS[i % len(QUESTIONS)], "en", session_id=f"bench-{i}"):
+            pass
+
+    image_path = os.path.join(workdir, "diet_log.jpg")
+
+    def image(i):
+        with open(image_path, "wb") as f:
+            f.write(os.urandom(2048))  # New bytes each turn, so the OCR cache does not hide Vision latency
+        chatbot_rag.central_chat_system(f"image: {image_path} | Is my dinner okay?", "en", session_id=f"bench-img-{i}")
+
+    results["qa"] = measure(qa, args.queries)
+    results["qa_stream"] = measure(qa_stream, args.queries)
+    results["image"] = measure(image, max(1, args.queries // 4))
+    scheduler.shutdown()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(old_path, new_path):
+    """Print p95 change per flow and stage between two result files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {r["docs"]: r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = {r["docs"]: r for r in json.load(f)["results"]}
+    for docs in sorted(set(old) & set(new)):
+        print(f"--- {docs} docs ---")
+        for flow, n in new[docs].items():
+            if flow == "docs" or flow not in old[docs]:
+                continue
+            o = old[docs][flow]
+            print(f"{flow:>18}: throughput {o['throughput_per_s']:.2f} -> {n['throughput_per_s']:.2f}/s, "
+                  f"peak mem {o['peak_python_mem_mb']:.1f} -> {n['peak_python_mem_mb']:.1f} MB")
+            for stage, s in sorted(n["stages"].items()):
+                if stage in o["stages"]:
+                    before, after = o["stages"][stage]["p95_s"], s["p95_s"]
+                    change = f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+                    print(f"{'':>20}{stage:<20} p95 {before * 1000:8.1f} -> {after * 1000:8.1f} ms ({change})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,40,160", help="comma-separated corpus sizes (documents)")
+    parser.add_argument("--queries", type=int, default=20, help="QA turns per flow")
+    parser.add_argument("--gemini-latency", type=float, default=0.05)
+    parser.add_argument("--chunk-delay", type=float, default=0.005)
+    parser.add_argument("--vision-latency", type=float, default=0.2)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--gemini-rpm", type=int, default=0, help="scheduler requests/minute (0: unlimited)")
+    parser.add_argument("--gemini-tpm", type=int, default=0, help="scheduler tokens/minute (0: unlimited)")
+    parser.add_argument("--output", help="results JSON path (default bench_results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = git_commit()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)  # chat_logs/, metrics/, ocr_logs/ and cache/ land in the temp dir
+        try:
+            for size in (int(s) for s in args.sizes.split(",")):
+                print(f"⏱️ Benchmarking {size} documents...")
+                results.append(bench_size(size, args, workdir))
+        finally:
+            os.chdir(cwd)
+    output = args.output or os.path.join("bench_results", f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "config": vars(args), "results": results}, f, indent=2)
+    for r in results:
+        print(f"{r['docs']:>5} docs | " + " | ".join(
+            f"{flow} {r[flow]['throughput_per_s']:.1f}/s" for flow in r if flow != "docs"))
+    print(f"✅ Saved results to {output}")
+
+if __name__ == "__main__":
+    main()
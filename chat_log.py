@@ -0,0 +1,141 @@
+import os
+import json
+import glob
+import threading
+from datetime import datetime
+
+try:
+    import fcntl  # POSIX file locks
+except ImportError:
+    fcntl = None
+
+# Append-only JSONL chat log with size/date rotation.
+LOG_DIR = "chat_logs"
+LOG_FILE = "chat_history.jsonl"
+LEGACY_FILE = "chat_history.json"   # Old format: one JSON array rewritten on every message
+MAX_BYTES = 5 * 1024 * 1024         # Rotate when the active file grows past 5 MB
+ROTATE_DAILY = True                 # Also rotate when the date changes
+
+_lock = threading.Lock()
+
+def _active_path(log_dir):
+    return os.path.join(log_dir, LOG_FILE)
+
+def _rotated_paths(log_dir):
+    """Rotated files, oldest first (names sort by timestamp)."""
+    return sorted(glob.glob(os.path.join(log_dir, "chat_history-*.jsonl")))
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _maybe_rotate(path, max_bytes, rotate_daily):
+    """Rename the active file aside if it is too big or from an earlier day."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return
+    if st.st_size == 0:
+        return
+    modified = datetime.fromtimestamp(st.st_mtime)
+    too_big = max_bytes and st.st_size >= max_bytes
+    new_day = rotate_daily and modified.date() != datetime.now().date()
+    if too_big or new_day:
+        stamp = modified.strftime("%Y%m%d-%H%M%S-%f")
+        os.replace(path, os.path.join(os.path.dirname(path), f"chat_history-{stamp}.jsonl"))
+
+def migrate_legacy(log_dir=LOG_DIR):
+    """One-time conversion of chat_history.json (JSON array) into the JSONL log.
+    The old file is renamed to chat_history.json.migrated afterwards."""
+    legacy = os.path.join(log_dir, LEGACY_FILE)
+    if not os.path.exists(legacy):
+        return 0
+    with _lock:
+        if not os.path.exists(legacy):
+            return 0
+        try:
+            with open(legacy, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not migrate {legacy}: {e}")
+            return 0
+        if not isinstance(history, list):
+            history = []
+        # Legacy entries are older than anything in the active log, so they become a rotated file.
+        stamp = datetime.fromtimestamp(os.path.getmtime(legacy)).strftime("%Y%m%d-%H%M%S-%f")
+        target = os.path.join(log_dir, f"chat_history-00000000-legacy-{stamp}.jsonl")
+        with open(target, "w", encoding="utf-8") as f:
+            for entry in history:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(legacy, legacy + ".migrated")
+    print(f"✅ Migrated {len(history)} chats from {legacy}")
+    return len(history)
+
+def append_entry(entry, log_dir=LOG_DIR, max_bytes=MAX_BYTES, rotate_daily=ROTATE_DAILY):
+    """Append one entry as a single JSON line. Safe across threads and (on POSIX) processes."""
+    os.makedirs(log_dir, exist_ok=True)
+    migrate_legacy(log_dir)
+    path = _active_path(log_dir)
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    with _lock:
+        # Lock a sidecar file so rotation and append are atomic with respect to other processes.
+        with open(path + ".lock", "a") as lock:
+            _lock_file(lock)
+            try:
+                _maybe_rotate(path, max_bytes, rotate_daily)
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            finally:
+                _unlock_file(lock)
+
+def _tail_lines(path, n, block_size=8192):
+    """Return the last n non-empty lines of a file, reading backwards in blocks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = [l for l in data.split(b"\n") if l.strip()]
+    if pos > 0:
+        lines = lines[1:]  # First line may be partial
+    return lines[-n:]
+
+def read_last(n=10, log_dir=LOG_DIR):
+    """Return the last n chat entries (oldest first) without parsing the whole history."""
+    migrate_legacy(log_dir)
+    entries = []
+    for path in [_active_path(log_dir)] + _rotated_paths(log_dir)[::-1]:
+        if len(entries) >= n:
+            break
+        if not os.path.exists(path):
+            continue
+        parsed = []
+        for line in _tail_lines(path, n - len(entries)):
+            try:
+                parsed.append(json.loads(line))
+            except ValueError:
+                continue  # Skip a torn or corrupt line
+        entries = parsed + entries
+    return entries[-n:]
+
+def clear(log_dir=LOG_DIR):
+    """Delete the active and rotated logs. Returns True if anything was removed."""
+    removed = False
+    with _lock:
+        candidates = [_active_path(log_dir), os.path.join(log_dir, LEGACY_FILE)] + _rotated_paths(log_dir)
+        for path in candidates:
+            if os.path.exists(path):
+                os.remove(path)
+                removed = True
+    return removed
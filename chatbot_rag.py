@@ -1,113 +1,71 @@
 # chatbot_rag.py
 import os
-import json
 from datetime import datetime
-from dotenv import load_dotenv
-import google.generativeai as genai
-from google.cloud import vision
-import io
-from PIL import Image
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langdetect import detect
-from load_docs import load_docs_from_folder
+import time
+import itertools
+from website_cache import get_website_summary
+import chat_log
+import resources
+import ocr_service
+from table_reconstruction import reconstruct_table, table_to_text
+import metrics
+import prompts
+from sessions import SessionManager
+from lang_detect import detect_language
+from retrieval import ocr_queries, pack_context, retrieve_context
+from semantic_cache import is_follow_up
+from gemini_scheduler import DeadlineExceeded, open_stream
 
-# 🌍 Load env vars and API keys
-load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# 🧠 Gemini, FAISS, embeddings and Vision are built lazily on first use (see resources.py)
+sessions = SessionManager()  # One conversation per Streamlit session / CLI run
+DEFAULT_SESSION = "cli"
 
-# 🧠 Load Gemini + FAISS
-model = genai.GenerativeModel("models/gemini-2.5-pro")
-chat = model.start_chat()
-try:
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    vectorstore = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
-except Exception as e:
-    vectorstore = None
-    print("❌ FAISS index not found or failed to load. Please build and upload the faiss_index folder with index.faiss and index.pkl.")
-    print(f"Error details: {e}")
-
-# Fallback knowledge
+# Fallback knowledge (served from website_cache, refreshed in the background)
 def fetch_website_summary():
-    try:
-        import requests
-        r = requests.get("https://theobesitykiller.com/")
-        if r.status_code == 200:
-            return ("Obesity Killer Kit is a 100% natural Ayurvedic solution for safe weight loss. "
-                    "Contains 39 herbs. Reduces hunger, promotes digestion. Over 60,000 users.")
-    except: return ""
-    return ""
-
-# OCR diet log using Google Vision API
+    return get_website_summary()
 
-def extract_table_google_vision(image_path):
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "obesity-bot-train-00c737889aa7.json"
-    client = vision.ImageAnnotatorClient()
-    with io.open(image_path, 'rb') as image_file:
-        content = image_file.read()
-    image = vision.Image(content=content)
-    response = client.text_detection(image=image)
-    texts = response.text_annotations
-    if not texts:
-        return '', None
-    full_text = texts[0].description
-    rows = [row.split() for row in full_text.split('\n') if row.strip()]
-    today = datetime.now().strftime("%Y-%m-%d")
-    os.makedirs(f"ocr_logs/{today}", exist_ok=True)
-    path = f"ocr_logs/{today}/{os.path.basename(image_path).split('.')[0]}_ocr.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
-    structured = "\n".join([" | ".join(r) for r in rows])
-    return structured, path
+# OCR diet log using Google Vision API (see ocr_service.py: shared client, resize, hash cache)
+def ocr_rows_text(results):
+    """Structured table text for one or more OCR results (pages of the same log)."""
+    words = [dict(w, page=page) for page, result in enumerate(results) for w in result.get("words", [])]
+    if not words:
+        return "\n".join(" | ".join(row) for result in results for row in result["rows"])
+    return table_to_text(reconstruct_table(words))
 
-# Diet prompt (with markdown table formatting request)
+# Diet and QA prompts: static prefix + per-request suffix (templates in prompts.py)
 def generate_diet_prompt(structured_text, context_text, question=None, lang='en'):
-    prompt = (
-        "You're a personal wellness coach. The user uploaded a handwritten diet log:\n\n"
-        f"{structured_text}\n\n"
-        "Reference context from official docs:\n\n"
-        f"{context_text}\n\n"
-        "Instructions:\n"
-        "- ONLY use the information and rules present in the reference docs.\n"
-        "- Do NOT give advice, corrections, or suggestions that are not explicitly written in the docs.\n"
-        "- If the user breaks a rule or makes a mistake according to the docs, highlight and correct it.\n"
-        "- Highlight mistakes, missing items, or unhealthy patterns ONLY if they are mentioned in the docs, but dont mention dates of mistake.\n"
-        "- Answer in a professional, friendly tone but keeping a product customer care approach.\n"
-        "- Do NOT give any generic advice.\n"
-        "- If there is no rule or info in the docs about a mistake, DO NOT correct or suggest anything.\n"
-        "- Summarize issues as bullet points.\n"
-        "- don't mention dates of mistake.\n"
-        "- Compliment the user for what they did right in the log.\n"
-        "- Answer in brief as the user has no prior knowledge.\n"
-    )
-    # Force response language
-    if lang == 'hi':
-        prompt += "\nउत्तर हिंदी या हिंग्लिश में दें।"
-    elif lang == 'hi-en' or lang == 'hinglish':
-        prompt += "\nRespond in Hinglish (mix of Hindi and English) only."
-    elif lang == 'en':
-        prompt += "\nRespond in English only."
-    # Add question if present
-    if question:
-        prompt += f"\nAlso answer: '{question}' based only on the above log and docs."
-    return prompt
+    return prompts.diet_prefix() + prompts.diet_suffix(structured_text, question, lang, context_text)
+
+def build_qa_prompt(user_input, context, site, lang='en'):
+    return prompts.qa_prefix(site) + prompts.qa_suffix(user_input, lang, context)
+
+def load_corpus():
+    from load_docs import load_docs_from_folder
+    return load_docs_from_folder(prompts.DOCS_DIR)
+
+def cached_prefix_model(kind, site=None):
+    """Gemini model with the static prefix for kind ("diet" or "qa") held in Gemini's context cache,
+    so only the per-request suffix is sent. The prefix is the instructions (and website summary);
+    with GEMINI_PROMPT_CACHE=corpus it also holds the whole docs corpus and nothing is retrieved.
+    None when caching is unavailable: send full prompts."""
+    cache = resources.get_prompt_cache()
+    if cache is None:
+        return None
+    corpus = load_corpus if resources.PROMPT_CACHE_CORPUS else lambda: None
+    mode = resources.PROMPT_CACHE
+    with metrics.stage("prompt_prefix"):
+        if kind == "diet":
+            return cache.model_for("diet", lambda: prompts.diet_prefix(corpus()), extra=mode)
+        return cache.model_for("qa", lambda: prompts.qa_prefix(site, corpus()), extra=f"{mode}|{site}")
 
-# Save chats
+# Save chats (append-only JSONL, see chat_log.py)
 def save_chat(user_msg, bot_msg):
-    os.makedirs("chat_logs", exist_ok=True)
-    path = "chat_logs/chat_history.json"
-    history = []
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            try: history = json.load(f)
-            except: pass
-    history.append({
-        "timestamp": datetime.now().isoformat(),
-        "user": user_msg,
-        "bot": bot_msg
-    })
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    with metrics.stage("log_write"):
+        chat_log.append_entry({
+            "timestamp": datetime.now().isoformat(),
+            "user": user_msg,
+            "bot": bot_msg
+        })
 
 # CLI helpers
 def color(text, code): return f"\033[{code}m{text}\033[0m"
@@ -122,26 +80,25 @@ Commands:
 /clear    Delete chat history
 /save     Save last bot response to a file
 /lang     Show last detected language
-image: path.jpg | question  → Analyze image & ask question
+/cache    Show answer cache stats
+/search   Tune FAISS search, e.g. /search nprobe=16 or /search efSearch=64
+image: path.jpg | question  → Analyze image & ask question (path1.jpg, path2.jpg for multi-page logs)
 exit/quit → Exit bot
 """, '35'))
 
 def show_history():
-    path = "chat_logs/chat_history.json"
-    if not os.path.exists(path): print(color("No chat history yet.", '90')); return
-    with open(path, "r", encoding="utf-8") as f:
-        try: history = json.load(f)
-        except: print(color("Couldn't read history.", '90')); return
+    try: history = chat_log.read_last(10)
+    except Exception: print(color("Couldn't read history.", '90')); return
+    if not history: print(color("No chat history yet.", '90')); return
     print(color("\n--- Last 10 Chats ---", '35'))
-    for entry in history[-10:]:
+    for entry in history:
         print(color(f"[{entry['timestamp']}]", '90'))
         print_user(entry['user'])
         print_bot(entry['bot'])
     print(color("----------------------\n", '35'))
 
 def clear_history():
-    path = "chat_logs/chat_history.json"
-    if os.path.exists(path): os.remove(path); print(color("History cleared!", '32'))
+    if chat_log.clear(): print(color("History cleared!", '32'))
     else: print(color("No history found.", '90'))
 
 def show_feedback_options():
@@ -159,29 +116,34 @@ def show_customer_service():
 last_bot_response = None
 last_lang = None
 
+def format_source(metadata):
+    page = metadata.get('page')
+    return f"{metadata['source']} (p. {page})" if page else metadata['source']
+
 # --- Verbose and pricing/token tracking ---
-VERBOSE = True  # Set to True to enable debug info
-TOKEN_ESTIMATE_PER_CHAR = 0.25  # Rough estimate: 1 token ≈ 4 chars
+VERBOSE = False  # Set to True to print prompts and token usage (metrics are always recorded, see metrics.py)
+OCR_CONTEXT_TOKEN_BUDGET = 4000  # Max tokens of reference docs in a diet-log prompt
+QA_CONTEXT_TOKEN_BUDGET = 1200   # Max tokens of reference docs in a question prompt
+QA_FETCH_K = 8                   # Hits fetched before overlap merging/dedup trims them to the budget
+QA_MMR_LAMBDA = None             # e.g. 0.7 to prefer chunks that add new text (see retrieval.pack_context)
 
-def estimate_tokens(text):
-    return int(len(text) * TOKEN_ESTIMATE_PER_CHAR)
+def detect_lang(text, session_id=DEFAULT_SESSION):
+    """Detect the message language for response routing: 'hi', 'hinglish', 'en', ... (see lang_detect.py)."""
+    with metrics.stage("lang_detect"):
+        return detect_language(text, session_id)
 
 # --- Central Chat System ---
-def central_chat_system(user_input, lang):
-    """
-    Handles all chat logic (OCR, QA, commands) in one place.
-    Returns bot response and any extra info.
-    """
-    # Command handling
+def handle_command(user_input, lang):
+    """Run a slash command. Returns True if user_input was a command."""
     if user_input.lower() == "/help":
         print_help()
-        return None
+        return True
     if user_input.lower() == "/helpme":
         show_customer_service()
-        return None
+        return True
     if user_input.lower() == "/history":
         show_history()
-        return None
+        return True
     if user_input.lower().startswith("/save"):
         parts = user_input.split()
         if len(parts) == 2 and last_bot_response:
@@ -191,14 +153,47 @@ def central_chat_system(user_input, lang):
             print(color(f"Saved last answer to {filename}", '32'))
         else:
             print_error("Usage: /save filename.md (after a bot answer)")
-        return None
+        return True
+    if user_input.lower() == "/cache":
+        answer_cache = resources.get_answer_cache()
+        stats = answer_cache.stats() if answer_cache else {}
+        print(color(f"Answer cache: {stats or 'disabled'}", '35'))
+        print(color(metrics.render_prometheus(), '90'))
+        return True
+    if user_input.lower().startswith("/search"):
+        vectorstore = resources.get_vectorstore()
+        try:
+            params = dict(part.split("=", 1) for part in user_input.split()[1:])
+            params = {name: int(value) for name, value in params.items()}
+        except ValueError:
+            print_error("Usage: /search nprobe=16 (ivf) or /search efSearch=64 (hnsw)")
+            return True
+        if vectorstore is None:
+            print_error("No FAISS index loaded.")
+            return True
+        from index_storage import set_search_params
+        set_search_params(vectorstore.index, **params)
+        print(color(f"Search index: {type(vectorstore.index).__name__} {params or ''}", '35'))
+        return True
     if user_input.lower() == "/lang":
         print(color(f"Detected language: {lang}", '35'))
-        return None
+        return True
     if user_input.lower() == "/clear":
         confirm = input(color("Are you sure you want to clear chat history? (y/n): ", '31')).strip().lower()
         if confirm == 'y': clear_history()
         else: print(color("Cancelled.", '90'))
+        return True
+    return False
+
+def prepare_turn(user_input, lang, session_id=DEFAULT_SESSION, images=None):
+    """
+    Everything before the Gemini call: commands, OCR, retrieval, cache lookup, prompt.
+    images: optional [(name, bytes)] for an image: message (e.g. Streamlit uploads).
+    Returns None (nothing to answer), {"reply": text} (answer without calling Gemini)
+    or a turn dict with the prompt to send.
+    """
+    global last_bot_response
+    if handle_command(user_input, lang):
         return None
 
     # OCR Mode
@@ -206,71 +201,217 @@ def central_chat_system(user_input, lang):
         parts = user_input.split("|", 1)
         image_path = parts[0].replace("image:", "").strip()
         question = parts[1].strip() if len(parts) > 1 else None
-        if not os.path.exists(image_path):
-            print_error("Image not found."); return None
+        if images is None:
+            # CLI: one path, or several comma-separated pages of the same log
+            paths = [p.strip() for p in image_path.split(",") if p.strip()]
+            missing = [p for p in paths if not os.path.exists(p)]
+            if not paths or missing:
+                print_error("Image not found."); return None
+            images = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    images.append((os.path.basename(path), f.read()))
+        metrics.start_turn("ocr", lang=lang)
         print(color(f"📸 Reading image: {image_path}", '34'))
-        structured_text, saved_path = extract_table_google_vision(image_path)
-        print(color(f"📄 OCR saved to: {saved_path}", '90'))
-        # Load docs context
-        context_text = load_docs_from_folder("docs")
-        prompt = generate_diet_prompt(structured_text, context_text, question, lang)
+        with metrics.stage("ocr"):
+            results = ocr_service.ocr_images(images)
+        structured_text = ocr_rows_text(results)
+        for result in results:
+            note = "cached" if result["cached"] else "saved to"
+            print(color(f"📄 OCR {note}: {result['path']}", '90'))
+        # Docs context: top chunks for the log rows/question (whole corpus only without an index,
+        # or already in the cached prefix with GEMINI_PROMPT_CACHE=corpus)
+        model = cached_prefix_model("diet")
+        vectorstore = resources.get_vectorstore()
+        if model is not None and resources.PROMPT_CACHE_CORPUS:
+            context_text = None
+        elif vectorstore is not None:
+            with metrics.stage("faiss_search"):
+                context_text, _ = retrieve_context(vectorstore, ocr_queries(structured_text, question),
+                                                   OCR_CONTEXT_TOKEN_BUDGET, count_tokens=resources.get_token_counter())
+        else:
+            with metrics.stage("doc_load"):
+                from load_docs import load_docs_from_folder
+                context_text = load_docs_from_folder("docs")
+        if model is not None:
+            prompt = prompts.diet_suffix(structured_text, question, lang, context_text)
+        else:
+            prompt = generate_diet_prompt(structured_text, context_text, question, lang)
         if VERBOSE:
             print(color(f"\n--- Gemini Prompt ---\n{prompt}\n---------------------", '90'))
-            print(color(f"Prompt chars: {len(prompt)} | Est. tokens: {estimate_tokens(prompt)}", '90'))
-        response = chat.send_message(prompt)
-        print_bot(response.text)
-        usage = getattr(response, 'usage_metadata', None)
-        if usage:
-            print(color(f"[Gemini usage] Input tokens: {usage.prompt_token_count}, Output tokens: {usage.candidates_token_count}, Total: {usage.total_token_count}", '90'))
-        else:
-            resp_tokens = estimate_tokens(response.text)
-            print(color(f"Response chars: {len(response.text)} | Est. tokens: {resp_tokens}", '90'))
-            print(color(f"Total est. tokens (prompt+response): {estimate_tokens(prompt) + resp_tokens}", '90'))
-        save_chat(user_input, response.text)
-        show_feedback_options()
-        return response.text
+            print(color(f"Prompt chars: {len(prompt)} | Tokens: {resources.get_token_counter()(prompt)}", '90'))
+        # Replayed history keeps the log itself (for follow-ups) but not the docs context
+        history_text = f"Diet log:\n{structured_text}" + (f"\nQuestion: {question}" if question else "")
+        return {"mode": "ocr", "user_input": user_input, "lang": lang, "prompt": prompt, "docs": [],
+                "session_id": session_id, "history_text": history_text, "model": model}
 
     # QA mode
+    metrics.start_turn("qa", lang=lang)
+    vectorstore = resources.get_vectorstore()
     if vectorstore is None:
         # Always return a visible response in the web UI
-        return "❌ FAISS index not found. Please contact the admin to upload the required index files."
-    docs = vectorstore.similarity_search(user_input, k=6)
-    context = "\n\n".join([doc.page_content for doc in docs])
-    site = fetch_website_summary()
-    prompt = (
-        f"Use only the info below to answer the user:\n\n"
-        f"Website:\n{site}\n\nDocs:\n{context}\n\nUser: {user_input}"
-    )
-    # Force response language for QA mode
-    if lang == 'hi':
-        prompt += "\nउत्तर हिंदी या हिंग्लिश में दें।"
-    elif lang == 'hi-en' or lang == 'hinglish':
-        prompt += "\nRespond in Hinglish (mix of Hindi and English) only."
-    elif lang == 'en':
-        prompt += "\nRespond in English only."
-    try:
-        response = chat.send_message(prompt)
-    except Exception as e:
-        return f"❌ Gemini API error: {e}"
-    print_bot(response.text)
+        return {"reply": "❌ FAISS index not found. Please contact the admin to upload the required index files."}
+    # Embed once: the vector serves both the answer cache and the FAISS search
+    with metrics.stage("embed"):
+        query_vector = resources.get_embeddings().embed_query(user_input)
+    # The answer cache is shared across sessions, so follow-ups ("and for dinner?") skip it:
+    # they depend on this session's earlier turns
+    follow_up = sessions.has_history(session_id) and is_follow_up(user_input)
+    answer_cache = None if follow_up else resources.get_answer_cache()
+    cached = answer_cache.lookup(user_input, lang, vector=query_vector) if answer_cache else None
+    if answer_cache:
+        metrics.inc("answer_cache_hits_total" if cached else "answer_cache_misses_total")
+    if cached:
+        print(color("[Answer cache hit]", '90'))
+        sessions.record(session_id, user_input, cached)
+        save_chat(user_input, cached)
+        last_bot_response = cached
+        return {"reply": cached, "cached": True}
+    with metrics.stage("website_fetch"):
+        site = fetch_website_summary()
+    model = cached_prefix_model("qa", site)
+    if model is not None and resources.PROMPT_CACHE_CORPUS:
+        # Website and all docs are already in the cached prefix: send only the question
+        return {"mode": "qa", "user_input": user_input, "lang": lang, "prompt": prompts.qa_suffix(user_input, lang),
+                "docs": [], "query_vector": query_vector, "session_id": session_id, "history_text": user_input,
+                "model": model, "cacheable": answer_cache is not None}
+    with metrics.stage("faiss_search"):
+        hits = vectorstore.similarity_search_with_score_by_vector(query_vector, k=QA_FETCH_K)
+    with metrics.stage("context_pack"):
+        context, docs = pack_context(hits, QA_CONTEXT_TOKEN_BUDGET, resources.get_token_counter(), QA_MMR_LAMBDA)
+    if model is not None:
+        prompt = prompts.qa_suffix(user_input, lang, context)  # Instructions and website are cached
+    else:
+        prompt = build_qa_prompt(user_input, context, site, lang)
+    return {"mode": "qa", "user_input": user_input, "lang": lang, "prompt": prompt, "docs": docs,
+            "query_vector": query_vector, "session_id": session_id, "history_text": user_input, "model": model,
+            "cacheable": answer_cache is not None}
+
+def finish_turn(turn, text, usage=None):
+    """Everything after the answer is complete: sources, token accounting, cache, chat log."""
+    global last_bot_response
+    docs = turn["docs"]
     if docs and hasattr(docs[0], 'metadata') and 'source' in docs[0].metadata:
         print(color("\nSources:", '90'))
-        for doc in docs:
-            if 'source' in doc.metadata:
-                print(color(f"- {doc.metadata['source']}", '90'))
-    usage = getattr(response, 'usage_metadata', None)
+        for source in dict.fromkeys(format_source(doc.metadata) for doc in docs if 'source' in doc.metadata):
+            print(color(f"- {source}", '90'))
     if usage:
-        print(color(f"[Gemini usage] Input tokens: {usage.prompt_token_count}, Output tokens: {usage.candidates_token_count}, Total: {usage.total_token_count}", '90'))
+        prompt_tokens, response_tokens = usage.prompt_token_count, usage.candidates_token_count
     else:
-        resp_tokens = estimate_tokens(response.text)
-        print(color(f"Response chars: {len(response.text)} | Est. tokens: {resp_tokens}", '90'))
-        print(color(f"Total est. tokens (prompt+response): {estimate_tokens(prompt) + resp_tokens}", '90'))
-    save_chat(user_input, response.text)
+        count_tokens = resources.get_token_counter()
+        prompt_tokens, response_tokens = count_tokens(turn['prompt']), count_tokens(text)
+        metrics.inc("estimated_token_turns_total")
+    metrics.inc("prompt_tokens_total", prompt_tokens or 0)
+    metrics.inc("cached_prompt_tokens_total", getattr(usage, "cached_content_token_count", 0) or 0)
+    metrics.inc("response_tokens_total", response_tokens or 0)
+    if VERBOSE:
+        print(color(f"[Gemini usage] Input tokens: {prompt_tokens}, Output tokens: {response_tokens}", '90'))
+    answer_cache = resources.get_answer_cache() if turn.get("cacheable") else None
+    if answer_cache:
+        answer_cache.put(turn["user_input"], turn["lang"], text, vector=turn["query_vector"])
+    sessions.record(turn["session_id"], turn["history_text"], text)
+    save_chat(turn["user_input"], text)
+    last_bot_response = text
+    metrics.end_turn()
+
+def gemini_error_message(error):
+    if isinstance(error, DeadlineExceeded):
+        return "❌ The assistant is busy right now. Please try again in a minute."
+    return f"❌ Gemini API error: {error}"
+
+def central_chat_system(user_input, lang, session_id=DEFAULT_SESSION, images=None):
+    """
+    Handles all chat logic (OCR, QA, commands) in one place.
+    Returns bot response and any extra info.
+    """
+    turn = prepare_turn(user_input, lang, session_id, images)
+    if turn is None:
+        return None
+    if "reply" in turn:
+        metrics.end_turn()
+        if turn.get("cached"):
+            print_bot(turn["reply"])
+            show_feedback_options()
+        return turn["reply"]
+    model = turn["model"] or resources.get_model()
+
+    def attempt(timeout):  # Called again by the scheduler on 429/5xx, with a fresh chat each time
+        return sessions.start_chat(model, session_id).send_message(
+            turn["prompt"], request_options={"timeout": timeout})
+    try:
+        with metrics.stage("gemini"):
+            response = resources.get_scheduler().call(attempt, tokens=resources.get_token_counter()(turn["prompt"]))
+    except Exception as e:
+        metrics.inc("gemini_errors_total")
+        metrics.end_turn()
+        if turn["mode"] == "ocr":
+            raise
+        return gemini_error_message(e)
+    print_bot(response.text)
+    finish_turn(turn, response.text, getattr(response, 'usage_metadata', None))
     show_feedback_options()
     return response.text
 
+def central_chat_system_stream(user_input, lang, session_id=DEFAULT_SESSION, images=None):
+    """
+    Streaming variant of central_chat_system: yields the answer as text deltas
+    while Gemini generates it. Logging, token accounting and save_chat run once
+    the stream is complete.
+    """
+    turn = prepare_turn(user_input, lang, session_id, images)
+    if turn is None:
+        return
+    if "reply" in turn:
+        metrics.end_turn()
+        yield turn["reply"]
+        return
+    parts = []
+    start = time.perf_counter()
+    model = turn["model"] or resources.get_model()
+    scheduler = resources.get_scheduler()
+    prompt_tokens = resources.get_token_counter()(turn["prompt"])
+
+    def attempt(timeout):  # Reads the first chunk so quota/server errors are retried by the scheduler
+        response = sessions.start_chat(model, session_id).send_message(
+            turn["prompt"], stream=True, request_options={"timeout": timeout})
+        return (response,) + open_stream(response)
+    try:
+        response, first, rest = scheduler.call(attempt, tokens=prompt_tokens)
+        for chunk in itertools.chain([first] if first is not None else [], rest):
+            delta = getattr(chunk, 'text', '')
+            if delta:
+                if not parts:
+                    metrics.observe("gemini_first_token", time.perf_counter() - start)
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        metrics.inc("gemini_errors_total")
+        metrics.end_turn()
+        if turn["mode"] == "ocr":
+            raise
+        yield gemini_error_message(e)
+        return
+    metrics.observe("gemini", time.perf_counter() - start)
+    scheduler.settle(prompt_tokens, getattr(response, 'usage_metadata', None))
+    finish_turn(turn, "".join(parts), getattr(response, 'usage_metadata', None))
+
+def print_bot_stream(deltas):
+    """Print streamed deltas as they arrive; returns the full text."""
+    parts = []
+    for delta in deltas:
+        if not parts:
+            print(color("🤖 ", '36'), end="", flush=True)
+        parts.append(delta)
+        print(color(delta, '36'), end="", flush=True)
+    if parts:
+        print()
+    return "".join(parts)
+
 # Start chat (only when run directly, not when imported)
 if __name__ == "__main__":
+    resources.warm_up_async()
+    metrics.start_http_server_from_env()
+    metrics.start_file_writer()
     print(color("""
 🤖 Welcome to the Health Chatbot!
 - Ask anything about your health, diet, or the Obesity Killer kit.
@@ -284,9 +425,6 @@ if __name__ == "__main__":
             print(color("👋 Bye!", '32'))
             break
         # Detect language for auto-switch
-        lang = 'en'
-        try:
-            lang = detect(user_input)
-        except:
-            lang = 'en'
-        central_chat_system(user_input, lang)
+        lang = detect_lang(user_input)
+        if print_bot_stream(central_chat_system_stream(user_input, lang)):
+            show_feedback_options()
@@ -0,0 +1,277 @@
+import os
+import time
+import random
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import metrics
+
+# Shared front door for Gemini calls from every Streamlit session, the CLI and batch_runner.py:
+# requests/tokens-per-minute buckets, a fixed worker pool, interactive traffic ahead of batch,
+# jittered exponential backoff on 429/5xx and a deadline per call.
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+WORKERS = int(os.getenv("GEMINI_WORKERS", "8"))
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "60"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "1000000"))
+INTERACTIVE_DEADLINE_SECONDS = 60.0
+BATCH_DEADLINE_SECONDS = 600.0
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+BURST_SECONDS = 2.0             # Bucket capacity: at most this many seconds' worth of quota at once
+WINDOW_SECONDS = 60.0           # ...and never more than the per-minute limit in any window this long
+RESPONSE_TOKEN_ESTIMATE = 500   # Reserved per call for the answer; corrected from usage_metadata afterwards
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+class DeadlineExceeded(TimeoutError):
+    """The call could not be completed (queueing, rate limits and retries included) before its deadline."""
+
+RATE_LIMIT_NAMES = {"ResourceExhausted", "TooManyRequests"}
+SERVER_ERROR_NAMES = {"InternalServerError", "ServiceUnavailable", "BadGateway", "GatewayTimeout", "DeadlineExceeded"}
+
+def is_rate_limited(error):
+    return getattr(error, "code", None) == 429 or type(error).__name__ in RATE_LIMIT_NAMES
+
+def is_retryable(error):
+    """Quota (429) and server-side (5xx) errors; google.api_core exceptions carry the HTTP code."""
+    return (getattr(error, "code", None) in RETRYABLE_CODES
+            or type(error).__name__ in RATE_LIMIT_NAMES | SERVER_ERROR_NAMES)
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base·2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holding at most burst_seconds' worth, and never
+    grants more than rate_per_minute units in any WINDOW_SECONDS (a bucket alone would allow its
+    burst on top of a minute of refill, which trips Gemini's per-minute quota). take() blocks
+    until the units are available or the deadline passes; debit() charges usage found out afterwards."""
+
+    def __init__(self, rate_per_minute, burst_seconds=BURST_SECONDS, clock=time.monotonic):
+        self.limit = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._window = deque()  # (time, units) taken or debited within the last WINDOW_SECONDS
+        self._window_total = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window_total -= self._window.popleft()[1]
+        return now
+
+    def _charge(self, now, amount):
+        if amount >= 0:
+            self._window.append((now, amount))
+            self._window_total += amount
+            return
+        refund = -amount  # Refunds cancel the newest charges, so every entry stays positive
+        while refund > 0 and self._window:
+            granted_at, units = self._window.pop()
+            if units > refund:
+                self._window.append((granted_at, units - refund))
+            self._window_total -= min(units, refund)
+            refund -= units
+
+    def _window_wait(self, amount, now):
+        """Seconds until amount more units fit under the limit for the sliding window."""
+        excess = self._window_total + amount - self.limit
+        if excess <= 0:
+            return 0.0
+        for granted_at, units in self._window:
+            excess -= units
+            if excess <= 0:
+                return granted_at + WINDOW_SECONDS - now
+        return WINDOW_SECONDS
+
+    def take(self, amount, deadline=None):
+        """Take amount units; False if the deadline passes first. Amounts above capacity wait for a full bucket."""
+        if not self.rate:
+            return True
+        amount = min(amount, self.capacity, self.limit)
+        with self._cond:
+            while True:
+                now = self._refill()
+                wait = max((amount - self.level) / self.rate, self._window_wait(amount, now))
+                if wait <= 0:
+                    self.level -= amount
+                    self._charge(now, amount)
+                    return True
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0 or remaining < wait:
+                        return False
+                self._cond.wait(wait)
+
+    def debit(self, amount):
+        """Adjust after the fact (negative gives units back); the level may go below zero."""
+        with self._cond:
+            now = self._refill()
+            self.level = min(self.capacity, self.level - amount)
+            self._charge(now, amount)
+            self._cond.notify_all()
+
+class _Job:
+    def __init__(self, fn, priority, deadline, tokens):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.tokens = tokens
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+class GeminiScheduler:
+    """Bounded pool of worker threads draining a priority queue of Gemini calls.
+
+    submit(fn) returns a Future; fn(timeout) performs one attempt (e.g. a send_message with
+    request_options={"timeout": timeout}) and is called again on retryable errors, so it should
+    build any per-attempt state (like a chat session) itself."""
+
+    def __init__(self, workers=WORKERS, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES,
+                 backoff=backoff_delay, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.in_flight = 0
+        self._threads = [threading.Thread(target=self._worker, name=f"gemini-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+        for priority, name in PRIORITY_NAMES.items():
+            metrics.set_gauge(f"gemini_queue_depth_{name}", lambda p=priority: self.queue_depth(p))
+        metrics.set_gauge("gemini_in_flight", lambda: self.in_flight)
+
+    def queue_depth(self, priority=None):
+        with self._cond:
+            return sum(1 for entry in self._heap if priority is None or entry[0] == priority)
+
+    def submit(self, fn, priority=INTERACTIVE, timeout=None, tokens=0):
+        """Queue fn(timeout_left) and return its Future. tokens: estimated prompt tokens for the TPM bucket."""
+        timeout = _default_timeout(priority) if timeout is None else timeout
+        job = _Job(fn, priority, time.monotonic() + timeout, tokens + RESPONSE_TOKEN_ESTIMATE)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Gemini scheduler is shut down")
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._cond.notify()
+        return job.future
+
+    def call(self, fn, priority=INTERACTIVE, timeout=None, tokens=0):
+        """submit() and wait for the result (re-raising the final error), at most until the deadline."""
+        timeout = _default_timeout(priority) if timeout is None else timeout
+        future = self.submit(fn, priority, timeout, tokens)
+        try:
+            return future.result(timeout=timeout)
+        except DeadlineExceeded:
+            raise
+        except FutureTimeout:
+            if future.cancel():  # Still queued: the worker skips it and returns its request slot
+                metrics.inc("gemini_deadline_exceeded_total")
+            raise DeadlineExceeded("Gemini call did not finish before its deadline") from None
+
+    def settle(self, tokens, usage):
+        """Correct the TPM bucket once real usage is known (streamed answers settle after the last chunk)."""
+        total = getattr(usage, "total_token_count", None) if usage is not None else None
+        if total is not None:
+            self.tokens.debit(total - tokens - RESPONSE_TOKEN_ESTIMATE)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if not self._heap:
+                    return  # Closed and drained
+                head = self._heap[0][2]
+            # Wait for a request slot first (no longer than the job at the front can wait), then hand
+            # it to whatever is most urgent right now, so batch jobs queued earlier cannot hold the
+            # rate limit while interactive ones wait.
+            if not self.requests.take(1, head.deadline):
+                with self._cond:
+                    if not self._heap or self._heap[0][2] is not head:
+                        continue  # Taken by another worker or overtaken by a more urgent job
+                    heapq.heappop(self._heap)
+                if head.future.set_running_or_notify_cancel():
+                    self._expire(head)
+                continue
+            with self._cond:
+                if not self._heap:
+                    self.requests.debit(-1)  # Another worker took the job; return the slot
+                    continue
+                _, _, job = heapq.heappop(self._heap)
+                self.in_flight += 1
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    metrics.observe(f"gemini_queue_wait_{PRIORITY_NAMES.get(job.priority, job.priority)}",
+                                    time.monotonic() - job.enqueued)
+                    self._run(job)
+                else:
+                    self.requests.debit(-1)  # Cancelled by call() after its deadline
+            finally:
+                with self._cond:
+                    self.in_flight -= 1
+
+    def _expire(self, job):
+        metrics.inc("gemini_deadline_exceeded_total")
+        job.future.set_exception(DeadlineExceeded("Gemini call did not finish before its deadline"))
+
+    def _run(self, job):
+        attempt = 0
+        while True:
+            if attempt and not self.requests.take(1, job.deadline):  # First attempt took its slot in _worker
+                return self._expire(job)
+            if time.monotonic() >= job.deadline or not self.tokens.take(job.tokens, job.deadline):
+                self.requests.debit(-1)  # The request slot was not used
+                return self._expire(job)
+            try:
+                result = job.fn(max(0.1, job.deadline - time.monotonic()))
+            except Exception as e:
+                delay = self.backoff(attempt)
+                if (not is_retryable(e) or attempt >= self.max_retries
+                        or time.monotonic() + delay >= job.deadline):
+                    job.future.set_exception(e)
+                    return
+                metrics.inc("gemini_retries_total")
+                if is_rate_limited(e):
+                    metrics.inc("gemini_rate_limited_total")
+                attempt += 1
+                self.sleep(delay)
+                continue
+            self.settle(job.tokens - RESPONSE_TOKEN_ESTIMATE, getattr(result, "usage_metadata", None))
+            job.future.set_result(result)
+            return
+
+def _default_timeout(priority):
+    return INTERACTIVE_DEADLINE_SECONDS if priority == INTERACTIVE else BATCH_DEADLINE_SECONDS
+
+def open_stream(response):
+    """For streaming calls: pull the first chunk inside the scheduled attempt, so quota and server
+    errors (raised on first read) are retried there. Returns (first_chunk or None, iterator over the rest)."""
+    chunks = iter(response)
+    return next(chunks, None), chunks
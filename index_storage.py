@@ -0,0 +1,252 @@
+import os
+import json
+import sqlite3
+import threading
+from functools import lru_cache
+from collections.abc import Mapping
+
+# On-disk index format shared by all serving processes:
+#   index.faiss      FAISS vectors, memory-mapped read-only so workers share the page cache
+#   docstore.sqlite  chunk text + metadata by vector position, read on demand
+# Replaces LangChain's index.pkl (pickle: slow to load, unsafe to unpickle, copied into every process).
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_FILE = "index.pkl"
+
+def _connect_ro(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+class _Reader:
+    """One read-only SQLite connection per thread (Streamlit serves sessions on several threads)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def query(self, sql, args=()):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect_ro(self.path)
+        return conn.execute(sql, args)
+
+class SQLiteIndexMap(Mapping):
+    """Read-only {vector position: docstore id} backed by docstore.sqlite."""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._len = reader.query("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def __getitem__(self, pos):
+        row = self._reader.query("SELECT id FROM chunks WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self):
+        return (row[0] for row in self._reader.query("SELECT pos FROM chunks ORDER BY pos"))
+
+    def __len__(self):
+        return self._len
+
+def _document(text, metadata):
+    from langchain_core.documents import Document
+    return Document(page_content=text, metadata=json.loads(metadata) if metadata else {})
+
+class SQLiteDocstore:
+    """Docstore that fetches chunk text and metadata from docstore.sqlite on demand.
+    Serving uses docstore_class(), which adds LangChain's Docstore base."""
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    def search(self, search):
+        row = self._reader.query("SELECT text, metadata FROM chunks WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return _document(*row)
+
+@lru_cache(maxsize=None)
+def docstore_class():
+    """SQLiteDocstore as a LangChain Docstore subclass, resolved on first use so that importing
+    this module does not load LangChain."""
+    try:
+        from langchain_community.docstore.base import Docstore
+    except ImportError:
+        return SQLiteDocstore
+    return type("SQLiteDocstore", (SQLiteDocstore, Docstore), {"__module__": __name__})
+
+def write_docstore(path, vectorstore):
+    """Write vector positions, ids, texts and metadata of a FAISS store to SQLite (atomically)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("CREATE TABLE chunks (pos INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+                     "text TEXT NOT NULL, metadata TEXT)")
+        rows = []
+        for pos, doc_id in vectorstore.index_to_docstore_id.items():
+            doc = vectorstore.docstore.search(doc_id)
+            rows.append((int(pos), doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+def save_index(vectorstore, index_dir):
+    """Save a FAISS store in the mmap + SQLite format and drop any stale index.pkl or approximate index."""
+    import faiss
+    os.makedirs(index_dir, exist_ok=True)
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    tmp = f"{index_path}.{os.getpid()}.tmp"
+    faiss.write_index(vectorstore.index, tmp)
+    write_docstore(os.path.join(index_dir, DOCSTORE_FILE), vectorstore)
+    os.replace(tmp, index_path)
+    # Approximate indexes built from the previous vectors no longer match docstore positions
+    stale = [LEGACY_FILE] + [ann_index_file(t) for t in INDEX_TYPES if t != "flat"]
+    for name in stale:
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+def read_faiss_index(path, mmap=True):
+    """Read a FAISS index, memory-mapped read-only when the FAISS build supports it."""
+    import faiss
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:
+            pass  # Index type without mmap support: read into memory
+    return faiss.read_index(path)
+
+# Approximate index options built from the flat vectors (same positions, so docstore.sqlite applies).
+# "{nlist}" is filled in from the corpus size; PQ48 stores 48 bytes per 384-d vector (8 dims per byte).
+INDEX_TYPES = {
+    "flat": "Flat",              # Exact scan (baseline)
+    "ivf": "IVF{nlist},Flat",    # Inverted lists, exact distances within probed lists
+    "hnsw": "HNSW32",            # Graph search
+    "sq8": "SQ8",                # 8-bit scalar quantization, exact scan (4x smaller)
+    "pq": "PQ48",                # Product quantization, exact scan (32x smaller)
+    "ivfpq": "IVF{nlist},PQ48",  # Inverted lists over PQ codes
+}
+
+def ann_index_file(index_type):
+    return INDEX_FILE if index_type == "flat" else f"index.{index_type}.faiss"
+
+PQ_MIN_TRAINING = 256  # PQ codebooks have 256 centroids per sub-quantizer
+
+def default_nlist(n_vectors):
+    """About 4·sqrt(n) lists, but keep >= 39 training points per list."""
+    return max(1, min(int(4 * n_vectors ** 0.5), n_vectors // 39))
+
+def build_ann_index(vectors, index_type, nlist=None):
+    """Train (if needed) and fill a FAISS index of index_type with the given float32 vectors."""
+    import faiss
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; choose from {', '.join(INDEX_TYPES)}")
+    n, dim = vectors.shape
+    spec = INDEX_TYPES[index_type].format(nlist=nlist or default_nlist(n))
+    if "PQ" in spec:
+        if n < PQ_MIN_TRAINING:
+            raise ValueError(f"{index_type} needs at least {PQ_MIN_TRAINING} chunks to train, got {n}")
+        if dim % 48:
+            spec = spec.replace("PQ48", f"PQ{dim // 8 if dim % 8 == 0 else dim}")
+    index = faiss.index_factory(dim, spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+def flat_vectors(index):
+    """All vectors of a flat index, in position order."""
+    return index.reconstruct_n(0, index.ntotal)
+
+def save_ann_index(vectorstore, index_dir, index_type):
+    """Write the approximate index for index_type next to the flat one. Returns its path."""
+    import faiss
+    path = os.path.join(index_dir, ann_index_file(index_type))
+    if index_type == "flat":
+        return path
+    index = build_ann_index(flat_vectors(vectorstore.index), index_type)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, path)
+    return path
+
+def set_search_params(index, **params):
+    """Tune query-time parameters (e.g. nprobe for IVF, efSearch for HNSW); unknown ones are skipped."""
+    import faiss
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        if value is None:
+            continue
+        try:
+            space.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # Parameter does not apply to this index type
+
+def has_docstore(index_dir):
+    return os.path.exists(os.path.join(index_dir, DOCSTORE_FILE))
+
+def _load_legacy(index_dir, embeddings, allow_pickle):
+    """LangChain's index.faiss + index.pkl, only if the caller opted in to unpickling it."""
+    from langchain_community.vectorstores import FAISS
+    if not allow_pickle:
+        raise ValueError(f"{index_dir} is in the legacy pickle format, which is not loaded by default "
+                         f"(unpickling can run arbitrary code). Convert it once with "
+                         f"`python index_storage.py convert {index_dir}`, or set FAISS_ALLOW_PICKLE=1.")
+    print(f"⚠️ {index_dir} uses the legacy pickle format; run `python index_storage.py convert {index_dir}`.")
+    return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+
+def load_vectorstore(index_dir, embeddings, mmap=True, index_type="flat", search_params=None, allow_pickle=False):
+    """Read-only FAISS store for serving: mmap'd vectors, chunks fetched from SQLite per hit.
+    index_type picks a prebuilt approximate index (falls back to flat if it was not built);
+    search_params are passed to set_search_params. Indexes still in the pickle format are
+    refused unless allow_pickle is set (run convert to migrate)."""
+    from langchain_community.vectorstores import FAISS
+    if not has_docstore(index_dir):
+        return _load_legacy(index_dir, embeddings, allow_pickle)
+    path = os.path.join(index_dir, ann_index_file(index_type))
+    if not os.path.exists(path):
+        print(f"⚠️ No {index_type} index in {index_dir}, using the flat index.")
+        path = os.path.join(index_dir, INDEX_FILE)
+    index = read_faiss_index(path, mmap)
+    set_search_params(index, **(search_params or {}))
+    reader = _Reader(os.path.join(index_dir, DOCSTORE_FILE))
+    return FAISS(embedding_function=embeddings, index=index,
+                 docstore=docstore_class()(reader), index_to_docstore_id=SQLiteIndexMap(reader))
+
+def load_mutable_vectorstore(index_dir, embeddings, allow_pickle=False):
+    """Fully in-memory, writable store (for incremental builds); legacy pickle only if allow_pickle."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    if not has_docstore(index_dir):
+        return _load_legacy(index_dir, embeddings, allow_pickle)
+    conn = sqlite3.connect(os.path.join(index_dir, DOCSTORE_FILE))
+    try:
+        rows = conn.execute("SELECT pos, id, text, metadata FROM chunks ORDER BY pos").fetchall()
+    finally:
+        conn.close()
+    docstore = InMemoryDocstore({doc_id: _document(text, meta) for _, doc_id, text, meta in rows})
+    return FAISS(embedding_function=embeddings,
+                 index=read_faiss_index(os.path.join(index_dir, INDEX_FILE), mmap=False),
+                 docstore=docstore, index_to_docstore_id={pos: doc_id for pos, doc_id, _, _ in rows})
+
+def convert_legacy(index_dir):
+    """One-time conversion of a LangChain index.faiss + index.pkl folder to the new format.
+    Only moves stored vectors and chunks, so no embedding model is needed."""
+    from langchain_community.vectorstores import FAISS
+    vectorstore = FAISS.load_local(index_dir, None, allow_dangerous_deserialization=True)
+    save_index(vectorstore, index_dir)
+    print(f"✅ Converted {index_dir}: {len(vectorstore.index_to_docstore_id)} chunks in {DOCSTORE_FILE}")
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == "convert":
+        convert_legacy(sys.argv[2] if len(sys.argv) > 2 else "faiss_index")
+    else:
+        print("Usage: python index_storage.py convert [index_dir]")
@@ -0,0 +1,82 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Language routing for replies: 'hi' (Devanagari), 'hinglish' (Romanized Hindi), 'en',
+# or whatever langdetect says for anything else. Script and lexicon checks answer most
+# messages without touching the statistical model.
+DEVANAGARI = re.compile("[\u0900-\u097F]")
+LETTER = re.compile(r"[^\W\d_]", re.UNICODE)
+TOKEN = re.compile(r"[a-z']+")
+DEVANAGARI_SHARE = 0.3   # Share of letters in Devanagari to call a message Hindi
+HINGLISH_SHARE = 0.2     # Share of tokens from the Romanized-Hindi lexicon to call it Hinglish
+MAX_SESSIONS = 10000
+
+# Common Romanized-Hindi words. Words that are also ordinary English ("to", "main", "me", "hi", "par",
+# "the", "pet") and food names English speakers use too ("roti", "chai", "dahi") are left out so
+# English messages are not misrouted.
+HINGLISH_WORDS = frozenset("""
+hai hain ho hoon hun tha thi thay hoga hogi honge kya kyaa kaise kaisa kaisi kyun kyu kyon kab kahan
+kitna kitni kitne kaun kaunsa kaunsi nahi nahin nai mat aur bhi se ko ka ki ke mein mai mujhe mujhko mera
+meri mere hum humein hamara tum tumhara aap aapka aapki apna apni apne yeh ye woh wo vo iska uska unka
+karna karo karu karun karein kare karte karta karti kiya kiye kar raha rahi rahe sakta sakti sakte sakun
+chahiye chaiye lena lelo lun loon lu lete leta deta dena diya khana khaana khaya khayi khaate khate kha
+peena pina piya nashta subah shaam sham raat din roz rozana
+aaj kal abhi phir fir toh bahut bohot zyada jyada kam thoda thodi accha acha achha theek thik haan ji
+wala wali wale kuch sab sirf bas lekin magar agar jab tab isliye kyunki dawai dawa vajan wajan motapa
+bhook bhookh bhukh neend kamar badhna ghatana ghatna samajh batao bataiye bataye batayein pata
+""".split())
+
+# Frequent English function words: a Latin-script message with these and no Hindi words is English.
+ENGLISH_WORDS = frozenset("""
+the a an is are was were be been am do does did can could should would will i you he she it we they my your
+what how when where why which who this that these those and or but if of in on at for with from about after
+before not no yes please eat take drink kit weight diet much many any some have has had
+""".split())
+
+_sessions = OrderedDict()  # session id -> last detected language
+_lock = threading.Lock()
+
+def _statistical(text):
+    """langdetect, seeded once so the same text always gets the same answer."""
+    try:
+        from langdetect import DetectorFactory, detect
+        DetectorFactory.seed = 0
+        return detect(text)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=4096)
+def _classify(text):
+    """Language for one normalised message, or None when it carries no signal."""
+    letters = LETTER.findall(text)
+    if not letters:
+        return None
+    devanagari = sum(1 for ch in letters if DEVANAGARI.match(ch))
+    if devanagari / len(letters) >= DEVANAGARI_SHARE:
+        return 'hi'
+    tokens = TOKEN.findall(text)
+    if tokens and devanagari == 0 and all(ch.isascii() for ch in letters):
+        hindi = sum(1 for t in tokens if t in HINGLISH_WORDS)
+        english = sum(1 for t in tokens if t in ENGLISH_WORDS)
+        if hindi > english and hindi / len(tokens) >= HINGLISH_SHARE:
+            return 'hinglish'
+        if english:
+            return 'en'
+        if len(tokens) < 3:
+            return None  # Too short to tell ("ok", "thanks")
+    return _statistical(text)
+
+def detect_language(text, session_id=None, default='en'):
+    """Reply language for a message. Messages with no signal reuse the session's last language."""
+    lang = _classify(" ".join(text.lower().split()))
+    with _lock:
+        if lang is None:
+            return _sessions.get(session_id, default) if session_id is not None else default
+        if session_id is not None:
+            _sessions[session_id] = lang
+            _sessions.move_to_end(session_id)
+            while len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+    return lang
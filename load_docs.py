@@ -1,58 +1,146 @@
 import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 import pandas as pd
 
-def load_pdf_text(pdf_path):
-    """Extract text from a PDF file using PyMuPDF."""
-    text = ""
+# One unit of loaded text: file name, 1-based page (PDF) or row (sheet/CSV), None for TXT.
+DocRecord = namedtuple("DocRecord", ["source", "page", "text"])
+
+SUPPORTED_EXTENSIONS = (".pdf", ".xlsx", ".xls", ".csv", ".txt")
+PAGES_PER_TASK = 16   # PDF pages parsed per worker task; bounds memory held per result
+MAX_WORKERS = None    # None = os.cpu_count()
+
+def load_pdf_pages(pdf_path, start=0, stop=None):
+    """Return [(page_number, text)] for pages start..stop-1 of a PDF (1-based numbers)."""
+    pages = []
     try:
         doc = fitz.open(pdf_path)
-        for page in doc:
-            text += page.get_text("text") + "\n"
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for i in range(start, stop):
+            pages.append((i + 1, doc.load_page(i).get_text("text").strip()))
     except Exception as e:
         print(f"❌ Failed to read PDF {pdf_path}: {e}")
-    return text.strip()
+    return pages
 
-def load_excel_text(excel_path):
-    """Extract text from an Excel file, joining each row with |."""
+def load_pdf_text(pdf_path):
+    """Extract text from a PDF file using PyMuPDF."""
+    return "\n".join(text for _, text in load_pdf_pages(pdf_path)).strip()
+
+def _table_rows(df):
+    return df.astype(str).apply(lambda x: ' | '.join(x), axis=1).tolist()
+
+def load_table_rows(path):
+    """Return [(row_number, text)] for an Excel or CSV file, joining each row with |."""
+    kind = "CSV" if path.lower().endswith(".csv") else "Excel"
     try:
-        df = pd.read_excel(excel_path)
-        return "\n".join(df.astype(str).apply(lambda x: ' | '.join(x), axis=1)).strip()
+        df = pd.read_csv(path) if kind == "CSV" else pd.read_excel(path)
+        return [(i + 1, row.strip()) for i, row in enumerate(_table_rows(df))]
     except Exception as e:
-        print(f"❌ Failed to read Excel {excel_path}: {e}")
-        return ""
+        print(f"❌ Failed to read {kind} {path}: {e}")
+        return []
+
+def load_excel_text(excel_path):
+    """Extract text from an Excel file, joining each row with |."""
+    return "\n".join(text for _, text in load_table_rows(excel_path)).strip()
 
 def load_csv_text(csv_path):
     """Extract text from a CSV file, joining each row with |."""
+    return "\n".join(text for _, text in load_table_rows(csv_path)).strip()
+
+def load_txt_text(txt_path):
     try:
-        df = pd.read_csv(csv_path)
-        return "\n".join(df.astype(str).apply(lambda x: ' | '.join(x), axis=1)).strip()
+        with open(txt_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
     except Exception as e:
-        print(f"❌ Failed to read CSV {csv_path}: {e}")
+        print(f"❌ Failed to read TXT {txt_path}: {e}")
         return ""
 
-def load_docs_from_folder(folder_path):
-    """Load and concatenate text from all supported files in a folder."""
-    all_text = ""
+def list_doc_files(folder_path):
+    """Return sorted paths of all supported, non-hidden files in a folder."""
     if not os.path.isdir(folder_path):
-        print(f"❌ Folder does not exist: {folder_path}")
-        return all_text
-    for file in os.listdir(folder_path):
+        return []
+    paths = []
+    for file in sorted(os.listdir(folder_path)):
         if file.startswith('.') or file.startswith('~'):
             continue  # Skip hidden or temp files
         path = os.path.join(folder_path, file)
-        if not os.path.isfile(path):
-            continue
-        if file.lower().endswith(".pdf"):
-            all_text += load_pdf_text(path) + "\n"
-        elif file.lower().endswith((".xlsx", ".xls")):
-            all_text += load_excel_text(path) + "\n"
-        elif file.lower().endswith(".csv"):
-            all_text += load_csv_text(path) + "\n"
-        elif file.lower().endswith(".txt"):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    all_text += f.read().strip() + "\n"
-            except Exception as e:
-                print(f"❌ Failed to read TXT {path}: {e}")
-    return all_text.strip()
+        if os.path.isfile(path) and file.lower().endswith(SUPPORTED_EXTENSIONS):
+            paths.append(path)
+    return paths
+
+def _pdf_page_count(path):
+    try:
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except Exception as e:
+        print(f"❌ Failed to read PDF {path}: {e}")
+        return 0
+
+def _tasks(paths):
+    """Split files into (function, args) parse tasks: PDF page ranges, whole sheets, TXT files."""
+    for path in paths:
+        name = path.lower()
+        if name.endswith(".pdf"):
+            for start in range(0, _pdf_page_count(path), PAGES_PER_TASK):
+                yield path, load_pdf_pages, (path, start, start + PAGES_PER_TASK)
+        elif name.endswith((".xlsx", ".xls", ".csv")):
+            yield path, load_table_rows, (path,)
+        elif name.endswith(".txt"):
+            yield path, None, (path,)
+
+def _records(path, numbered):
+    source = os.path.basename(path)
+    for page, text in numbered:
+        if text:
+            yield DocRecord(source, page, text)
+
+def _run_task(path, fn, args):
+    numbered = [(None, load_txt_text(path))] if fn is None else fn(*args)
+    return _records(path, numbered)
+
+def iter_doc_records(paths, max_workers=MAX_WORKERS):
+    """Yield DocRecords for the given files (or a folder path), in file/page order.
+    PDF page ranges and spreadsheets are parsed in a process pool with at most
+    2 * workers tasks in flight, so memory stays bounded on large corpora.
+    max_workers=0 parses in-process."""
+    if isinstance(paths, str):
+        paths = list_doc_files(paths)
+    workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    tasks = _tasks(paths)
+    if workers <= 1:
+        for task in tasks:
+            yield from _run_task(*task)
+        return
+    pending = deque()  # (path, fn, args, future); TXT files are read in-process
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, fn, args in tasks:
+                future = pool.submit(fn, *args) if fn is not None else None
+                pending.append((path, fn, args, future))
+                while len(pending) > 2 * workers:
+                    yield from _drain_one(pending)
+            while pending:
+                yield from _drain_one(pending)
+    except (OSError, RuntimeError) as e:
+        # No process pool on this platform (or it broke): finish the remaining tasks in-process.
+        print(f"⚠️ Parallel loading unavailable, loading sequentially: {e}")
+        for path, fn, args, _ in pending:
+            yield from _run_task(path, fn, args)
+        for task in tasks:
+            yield from _run_task(*task)
+
+def _drain_one(pending):
+    path, fn, args, future = pending[0]
+    records = list(_run_task(path, fn, args)) if future is None else list(_records(path, future.result()))
+    pending.popleft()
+    yield from records
+
+def load_docs_from_folder(folder_path, max_workers=0):
+    """Load and concatenate text from all supported files in a folder.
+    Parses in-process by default: this runs on request threads of the chatbot, where forking a
+    process pool is unsafe. vector_store.py uses iter_doc_records with the pool instead."""
+    if not os.path.isdir(folder_path):
+        print(f"❌ Folder does not exist: {folder_path}")
+        return ""
+    return "\n".join(r.text for r in iter_doc_records(folder_path, max_workers)).strip()
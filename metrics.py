@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Per-stage latency, token and cache metrics. Each chat turn becomes one JSON line in
+# METRICS_LOG; aggregates are rendered in Prometheus text format when scraped over HTTP
+# and to PROMETHEUS_FILE on a timer, never on the request path.
+METRICS_LOG = os.path.join("metrics", "metrics.jsonl")
+METRICS_PORT_ENV = "METRICS_PORT"  # Set (e.g. METRICS_PORT=9108) to serve /metrics over HTTP
+METRICS_HOST_ENV = "METRICS_HOST"  # Interface to bind; localhost only unless set (e.g. 0.0.0.0)
+PROMETHEUS_FILE = os.path.join("metrics", "metrics.prom")
+PROMETHEUS_FILE_INTERVAL = 15.0    # Seconds between rewrites of PROMETHEUS_FILE
+WINDOW = 1000          # Latest samples per stage used for quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+ENABLED = True
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))  # stage -> recent durations (s)
+_sums = defaultdict(float)                            # stage -> total seconds
+_counts = defaultdict(int)                            # stage -> observations
+_counters = defaultdict(float)                        # name -> running total
+_gauges = {}                                          # name -> callable or value
+_local = threading.local()
+
+def observe(stage, seconds):
+    """Record one duration for a stage (and on the current turn, if any)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _samples[stage].append(seconds)
+        _sums[stage] += seconds
+        _counts[stage] += 1
+    turn = getattr(_local, "turn", None)
+    if turn is not None:
+        turn["stages"][stage] = turn["stages"].get(stage, 0.0) + seconds
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as one observation of stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def inc(name, value=1):
+    """Add to a counter (and to the current turn's fields, if any)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] += value
+    turn = getattr(_local, "turn", None)
+    if turn is not None:
+        turn["counters"][name] = turn["counters"].get(name, 0) + value
+
+def set_gauge(name, value):
+    """Set a gauge to a value, or to a zero-argument callable read at render time."""
+    with _lock:
+        _gauges[name] = value
+
+def start_turn(mode, **fields):
+    """Begin collecting one chat turn's metrics on this thread."""
+    _local.turn = {"timestamp": datetime.now().isoformat(), "mode": mode, "stages": {},
+                   "counters": {}, "_start": time.perf_counter(), **fields}
+
+def end_turn(path=METRICS_LOG):
+    """Finish the current turn: append it to the JSON log."""
+    turn = getattr(_local, "turn", None)
+    _local.turn = None
+    if turn is None or not ENABLED:
+        return None
+    turn["total_s"] = time.perf_counter() - turn.pop("_start")
+    observe("turn_total", turn["total_s"])
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"⚠️ Could not write metrics: {e}")
+    return turn
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+def snapshot():
+    """Current aggregates as a dict: per-stage count/sum/quantiles, counters, gauges."""
+    with _lock:  # Copy only: sorting outside the lock keeps observe()/inc() from waiting on a scrape
+        samples = {name: (list(values), _counts[name], _sums[name]) for name, values in _samples.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    stages = {}
+    for name, (values, count, total) in samples.items():
+        ordered = sorted(values)
+        stages[name] = {"count": count, "sum": total,
+                        **{f"p{int(q * 100)}": _quantile(ordered, q) for q in QUANTILES}}
+    gauges = {k: (v() if callable(v) else v) for k, v in gauges.items()}
+    hits = counters.get("answer_cache_hits_total", 0)
+    lookups = hits + counters.get("answer_cache_misses_total", 0)
+    gauges["answer_cache_hit_ratio"] = hits / lookups if lookups else 0.0
+    return {"stages": stages, "counters": counters, "gauges": gauges}
+
+def render_prometheus():
+    """Aggregates in Prometheus text exposition format."""
+    snap = snapshot()
+    lines = ["# TYPE chatbot_stage_seconds summary"]
+    for name, s in sorted(snap["stages"].items()):
+        for q in QUANTILES:
+            lines.append(f'chatbot_stage_seconds{{stage="{name}",quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'chatbot_stage_seconds_sum{{stage="{name}"}} {s["sum"]:.6f}')
+        lines.append(f'chatbot_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f"# TYPE chatbot_{name} counter")
+        lines.append(f"chatbot_{name} {value:g}")
+    for name, value in sorted(snap["gauges"].items()):
+        lines.append(f"# TYPE chatbot_{name} gauge")
+        lines.append(f"chatbot_{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=PROMETHEUS_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+def start_file_writer(path=PROMETHEUS_FILE, interval=PROMETHEUS_FILE_INTERVAL):
+    """Rewrite the Prometheus file every `interval` seconds from a daemon thread, and once at exit."""
+    def write():
+        try:
+            write_prometheus(path)
+        except Exception as e:
+            print(f"⚠️ Could not write metrics: {e}")
+
+    def loop():
+        while not stop.wait(interval):
+            write()
+
+    stop = threading.Event()
+    threading.Thread(target=loop, daemon=True).start()
+    atexit.register(write)
+    return stop
+
+def start_http_server(port=9108, host="127.0.0.1"):
+    """Serve render_prometheus() at http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_http_server_from_env():
+    """start_http_server() on $METRICS_PORT (bound to $METRICS_HOST, default 127.0.0.1) if it is set;
+    None otherwise or if the port is taken."""
+    port = int(os.getenv(METRICS_PORT_ENV) or 0)
+    if not port:
+        return None
+    host = os.getenv(METRICS_HOST_ENV) or "127.0.0.1"
+    try:
+        server = start_http_server(port, host)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _sums.clear()
+        _counts.clear()
+        _counters.clear()
+        _gauges.clear()
@@ -4,6 +4,7 @@ from google.cloud import vision
 from PIL import Image
 from datetime import datetime
 import io
+from table_reconstruction import words_from_vision, reconstruct_table, table_rows
 
 # Paths
 IMAGE_PATH = "trackreport5.jpg"
@@ -15,7 +16,9 @@ GOOGLE_CREDENTIALS = "obesity-bot-train-801a1cca327b.json"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = GOOGLE_CREDENTIALS
 
-def extract_text_with_google_vision(image_path, y_tolerance=25):
+def extract_text_with_google_vision(image_path, y_tolerance=None):
+    """OCR an image and rebuild its table rows from the word boxes (see table_reconstruction.py).
+    y_tolerance (pixels) overrides the adaptive row threshold."""
     client = vision.ImageAnnotatorClient()
     with io.open(image_path, 'rb') as image_file:
         content = image_file.read()
@@ -23,33 +26,12 @@ def extract_text_with_google_vision(image_path, y_tolerance=25):
     response = client.text_detection(image=image)
     texts = response.text_annotations
     if not texts:
-        return []
-    # Get all detected words with bounding box coordinates
-    words = []
-    for t in texts[1:]:  # texts[0] is the full text, skip it
-        if t.description.strip():
-            # Use the top-left vertex for y/x
-            v = t.bounding_poly.vertices[0]
-            words.append({
-                'text': t.description,
-                'x': v.x if v.x is not None else 0,
-                'y': v.y if v.y is not None else 0
-            })
-    # Sort and group by y-coordinate (like your previous logic)
-    words.sort(key=lambda w: (w['y'], w['x']))
-    rows = []
-    current_row = []
-    current_y = words[0]['y'] if words else 0
-    for word in words:
-        if abs(word['y'] - current_y) <= y_tolerance:
-            current_row.append(word)
-        else:
-            rows.append([w['text'] for w in sorted(current_row, key=lambda w: w['x'])])
-            current_row = [word]
-            current_y = word['y']
-    if current_row:
-        rows.append([w['text'] for w in sorted(current_row, key=lambda w: w['x'])])
-    return rows, words
+        return [], []
+    words = words_from_vision(texts)
+    rows = table_rows(reconstruct_table(words, row_gap=y_tolerance)) if words else []
+    # Top-left vertex of each word, for the coordinate printout
+    coords = [{'text': w['text'], 'x': w['vertices'][0][0], 'y': w['vertices'][0][1]} for w in words]
+    return rows, coords
 
 def save_json(data, path):
     with open(path, 'w', encoding='utf-8') as f:
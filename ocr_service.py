@@ -0,0 +1,131 @@
+import os
+import io
+import glob
+import json
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import resources
+from table_reconstruction import words_from_vision, reconstruct_table, table_rows
+
+# OCR service: one shared Vision client, image downscaling, batched/concurrent requests,
+# and a content-hash cache backed by the ocr_logs/ JSON files.
+OCR_LOG_DIR = "ocr_logs"
+MAX_IMAGE_SIDE = 2048            # Longest side sent to Vision; text stays legible well below phone resolution
+JPEG_QUALITY = 85
+RECOMPRESS_ABOVE_BYTES = 1 << 20 # Recompress any photo larger than 1 MB even if already small enough
+BATCH_SIZE = 16                  # Vision batch_annotate_images limit per request
+MAX_CONCURRENT_REQUESTS = 4
+
+_lock = threading.Lock()
+_index = {}  # content hash -> ocr_logs path
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+def prepare_image(content, max_side=MAX_IMAGE_SIDE, quality=JPEG_QUALITY):
+    """Downscale and recompress a large photo to JPEG. Small images are returned unchanged."""
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            if max(img.size) <= max_side and len(content) <= RECOMPRESS_ABOVE_BYTES:
+                return content
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_side, max_side))
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True)
+    except Exception as e:
+        print(f"⚠️ Could not resize image, sending original: {e}")
+        return content
+    data = out.getvalue()
+    return data if len(data) < len(content) else content
+
+def _cache_path(digest, name):
+    today = datetime.now().strftime("%Y-%m-%d")
+    stem = os.path.splitext(os.path.basename(name or "upload"))[0] or "upload"
+    return os.path.join(OCR_LOG_DIR, today, f"{stem}_{digest[:16]}_ocr.json")
+
+def _find_cached(digest):
+    """Path of an earlier OCR result for this content hash, or None."""
+    with _lock:
+        path = _index.get(digest)
+    if path and os.path.exists(path):
+        return path
+    for path in glob.glob(os.path.join(OCR_LOG_DIR, "*", f"*_{digest[:16]}_ocr.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if json.load(f).get("hash") == digest:
+                    with _lock:
+                        _index[digest] = path
+                    return path
+        except Exception:
+            continue
+    return None
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    result["path"] = path
+    result["cached"] = True
+    return result
+
+def _parse(response, digest, name):
+    """Turn one Vision response into the stored result: full text, word boxes and the rebuilt table."""
+    texts = response.text_annotations
+    full_text = texts[0].description if texts else ""
+    words = words_from_vision(texts)
+    table = reconstruct_table(words) if words else {"header": [], "rows": []}
+    return {"hash": digest, "name": name, "full_text": full_text, "rows": table_rows(table),
+            "table": table, "words": words}
+
+def _save(result):
+    path = _cache_path(result["hash"], result["name"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    with _lock:
+        _index[result["hash"]] = path
+    return dict(result, path=path, cached=False)
+
+def _annotate_batch(batch):
+    """One batch_annotate_images call for [(digest, name, prepared_bytes)]."""
+    from google.cloud import vision
+    client = resources.get_vision_client()
+    requests = [vision.AnnotateImageRequest(
+        image=vision.Image(content=content),
+        features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]) for _, _, content in batch]
+    response = client.batch_annotate_images(requests=requests)
+    results = []
+    for (digest, name, _), resp in zip(batch, response.responses):
+        if getattr(resp.error, "message", ""):
+            raise RuntimeError(f"Vision OCR failed for {name}: {resp.error.message}")
+        results.append(_save(_parse(resp, digest, name)))
+    return results
+
+def ocr_images(images):
+    """OCR [(name, bytes)] and return one result dict per image, in order.
+    Cached images (same bytes seen before) skip Vision entirely; the rest are resized
+    and sent in batches of BATCH_SIZE, MAX_CONCURRENT_REQUESTS batches at a time."""
+    results = [None] * len(images)
+    todo = {}  # digest -> (name, content, [positions])
+    for i, (name, content) in enumerate(images):
+        digest = content_hash(content)
+        path = _find_cached(digest)
+        if path:
+            results[i] = _load(path)
+        elif digest in todo:
+            todo[digest][2].append(i)
+        else:
+            todo[digest] = (name, content, [i])
+    if todo:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as pool:
+            digests = list(todo)
+            prepared = list(pool.map(lambda d: prepare_image(todo[d][1]), digests))
+            batch_items = [(d, todo[d][0], data) for d, data in zip(digests, prepared)]
+            batches = [batch_items[i:i + BATCH_SIZE] for i in range(0, len(batch_items), BATCH_SIZE)]
+            for batch_results in pool.map(_annotate_batch, batches):
+                for result in batch_results:
+                    for i in todo[result["hash"]][2]:
+                        results[i] = result
+    return results
@@ -0,0 +1,226 @@
+import os
+import time
+import hashlib
+import threading
+from datetime import timedelta
+import metrics
+
+# Prompt layout: a static prefix that is identical across requests, then a per-request suffix
+# (retrieved docs, diet log / question, reply language). The prefix holds the instructions and
+# website summary, plus the whole reference corpus only when that is opted into (retrieval is
+# then skipped). It is registered once with Gemini context caching so it is neither re-sent nor
+# re-billed at the full input rate; without caching the same layout still puts the shared text first.
+PROMPT_VERSION = "2"             # Bump whenever the template text below changes
+DOCS_DIR = "docs"
+INDEX_DIR = "faiss_index"
+CACHE_TTL_SECONDS = 60 * 60
+REFRESH_MARGIN_SECONDS = 5 * 60  # Extend a cached prefix this long before it expires
+RETRY_FAILED_SECONDS = 10 * 60   # After a failed registration, send full prompts this long before retrying
+FINGERPRINT_CHECK_SECONDS = 5.0  # docs/ and index are re-stat'ed at most this often
+PREFIX_MIN_TOKENS = 4096         # Gemini 2.5 Pro rejects smaller cached contents; send those as full prompts
+PREFIX_MAX_TOKENS = 150_000      # Larger corpora are retrieved per request instead of cached whole
+
+# --- Templates (built once at import; per-request assembly is a single join) ---
+
+LANG_INSTRUCTIONS = {
+    'hi': "\nउत्तर हिंदी या हिंग्लिश में दें।",
+    'hi-en': "\nRespond in Hinglish (mix of Hindi and English) only.",
+    'hinglish': "\nRespond in Hinglish (mix of Hindi and English) only.",
+    'en': "\nRespond in English only.",
+}
+
+DIET_HEAD = (
+    "You're a personal wellness coach. The user uploads a handwritten diet log; review it against the reference docs.\n\n"
+    "Instructions:\n"
+    "- ONLY use the information and rules present in the reference docs.\n"
+    "- Do NOT give advice, corrections, or suggestions that are not explicitly written in the docs.\n"
+    "- If the user breaks a rule or makes a mistake according to the docs, highlight and correct it.\n"
+    "- Highlight mistakes, missing items, or unhealthy patterns ONLY if they are mentioned in the docs, but dont mention dates of mistake.\n"
+    "- Answer in a professional, friendly tone but keeping a product customer care approach.\n"
+    "- Do NOT give any generic advice.\n"
+    "- If there is no rule or info in the docs about a mistake, DO NOT correct or suggest anything.\n"
+    "- Summarize issues as bullet points.\n"
+    "- don't mention dates of mistake.\n"
+    "- Compliment the user for what they did right in the log.\n"
+    "- Answer in brief as the user has no prior knowledge.\n\n"
+    "Reference context from official docs:\n\n"
+)
+DIET_LOG_HEAD = "The user uploaded a handwritten diet log:\n\n"
+DIET_QUESTION = "\nAlso answer: '{}' based only on the above log and docs."
+
+QA_HEAD = "Use only the info below to answer the user:\n\nWebsite:\n"
+QA_DOCS_HEAD = "\n\nDocs:\n"
+QA_USER_HEAD = "User: "
+SECTION_END = "\n\n"
+
+# The docs context goes in the prefix (whole corpus, cached) or in the suffix (retrieved per
+# request); either way prefix + suffix is the same prompt text.
+
+def diet_prefix(context_text=None):
+    return "".join((DIET_HEAD, context_text, SECTION_END)) if context_text is not None else DIET_HEAD
+
+def diet_suffix(structured_text, question=None, lang='en', context_text=None):
+    return "".join((context_text + SECTION_END if context_text is not None else "",
+                    DIET_LOG_HEAD, structured_text, "\n", LANG_INSTRUCTIONS.get(lang, ""),
+                    DIET_QUESTION.format(question) if question else ""))
+
+def qa_prefix(site, context=None):
+    return "".join((QA_HEAD, site, QA_DOCS_HEAD, context, SECTION_END)) if context is not None else QA_HEAD + site
+
+def qa_suffix(user_input, lang='en', context=None):
+    return "".join((QA_DOCS_HEAD + context + SECTION_END if context is not None else "",
+                    QA_USER_HEAD, user_input, LANG_INSTRUCTIONS.get(lang, "")))
+
+# --- Invalidation ---
+
+def sources_fingerprint(docs_dir=DOCS_DIR, index_dir=INDEX_DIR):
+    """Changes whenever a file in docs/ or the FAISS index is added, removed or rewritten."""
+    parts = [PROMPT_VERSION]
+    for folder in (docs_dir, index_dir):
+        try:
+            entries = sorted(os.scandir(folder), key=lambda e: e.name)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith(('.', '~')):
+                st = entry.stat()
+                parts.append(f"{folder}/{entry.name}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+# --- Context caching ---
+
+class GeminiContextCache:
+    """Backend for PrefixCache using google.generativeai's CachedContent API."""
+
+    def find(self, model_name, display_name):
+        from google.generativeai import caching
+        for cached in caching.CachedContent.list():
+            if cached.display_name == display_name and cached.model.endswith(model_name.split("/")[-1]):
+                return cached
+        return None
+
+    def create(self, model_name, display_name, text, ttl):
+        from google.generativeai import caching
+        return caching.CachedContent.create(model=model_name, display_name=display_name,
+                                            contents=[text], ttl=timedelta(seconds=ttl))
+
+    def extend(self, handle, ttl):
+        handle.update(ttl=timedelta(seconds=ttl))
+
+    def delete(self, handle):
+        handle.delete()
+
+    def model_for(self, handle):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(cached_content=handle)
+
+class PrefixCache:
+    """Registers static prompt prefixes with a context-caching backend and hands out models bound
+    to them. A prefix is re-registered when docs/, the index, PROMPT_VERSION or `extra` change, and
+    the superseded one is deleted."""
+
+    def __init__(self, backend, model_name, count_tokens=None, ttl=CACHE_TTL_SECONDS,
+                 fingerprint_fn=sources_fingerprint, min_tokens=PREFIX_MIN_TOKENS, max_tokens=PREFIX_MAX_TOKENS):
+        self.backend = backend
+        self.model_name = model_name
+        self.count_tokens = count_tokens
+        self.ttl = ttl
+        self.fingerprint_fn = fingerprint_fn
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self._entries = {}  # kind -> {"key", "handle", "model", "expires"}
+        self._fingerprint = (0.0, None)
+        self._lock = threading.Lock()  # Guards _registering only; never held during I/O
+        self._registering = {}         # kind -> Lock held by the one caller registering that prefix
+
+    def fingerprint(self):
+        checked, value = self._fingerprint
+        now = time.monotonic()
+        if value is None or now - checked > FINGERPRINT_CHECK_SECONDS:
+            value = self.fingerprint_fn()
+            self._fingerprint = (now, value)
+        return value
+
+    def _current(self, kind, key, now):
+        """(True, model or None) when the registered entry settles this request without any I/O."""
+        entry = self._entries.get(kind)
+        if not entry or entry["key"] != key:
+            return False, None
+        if entry["model"] is None:
+            return now < entry["expires"], None  # Recently failed; full prompts until the retry time
+        return now < entry["expires"] - REFRESH_MARGIN_SECONDS, entry["model"]
+
+    def model_for(self, kind, build, extra=""):
+        """Gemini model with the `kind` prefix cached, or None (send the full prompt instead).
+        build() returns the prefix text and only runs when the prefix has to be registered (or
+        looked up after a restart); prefixes outside min_tokens-max_tokens never reach the backend.
+        One caller per kind registers or extends the prefix; concurrent callers do not wait for
+        it but keep using the current model until it expires, or send full prompts."""
+        key = hashlib.sha256(f"{kind}|{self.fingerprint()}|{extra}".encode("utf-8")).hexdigest()[:16]
+        now = time.time()
+        settled, model = self._current(kind, key, now)
+        if settled:
+            return model
+        with self._lock:
+            lock = self._registering.setdefault(kind, threading.Lock())
+        if not lock.acquire(blocking=False):
+            entry = self._entries.get(kind)
+            live = entry and entry["key"] == key and entry["model"] is not None and now < entry["expires"]
+            return entry["model"] if live else None
+        try:
+            settled, model = self._current(kind, key, now)  # Another caller may have just finished
+            if settled:
+                return model
+            entry = self._entries.get(kind)
+            if entry and entry["key"] == key and entry["model"] is not None:
+                try:
+                    self.backend.extend(entry["handle"], self.ttl)
+                    entry["expires"] = now + self.ttl
+                    return entry["model"]
+                except Exception as e:
+                    print(f"⚠️ Could not extend cached prompt prefix {kind}: {e}")
+            model = self._register(kind, key, build, now)
+            if entry and entry["handle"] is not None and entry["key"] != key:
+                try:
+                    self.backend.delete(entry["handle"])
+                except Exception as e:
+                    print(f"⚠️ Could not delete old prompt prefix {kind}: {e}")
+            return model
+        finally:
+            lock.release()
+
+    def _register(self, kind, key, build, now):
+        display_name = f"chatbot-{kind}-v{PROMPT_VERSION}-{key}"
+        try:
+            text = build()
+            tokens = self.count_tokens(text) if self.count_tokens else None
+            if tokens is not None and not self.min_tokens <= tokens <= self.max_tokens:
+                # Not cacheable until the sources change (a new key): no retries, full prompts
+                print(f"ℹ️ Prompt prefix {kind} is {tokens} tokens (cacheable: {self.min_tokens}-"
+                      f"{self.max_tokens}), sending full prompts")
+                self._entries[kind] = {"key": key, "handle": None, "model": None, "expires": float("inf")}
+                return None
+            handle = self.backend.find(self.model_name, display_name)
+            if handle is None:
+                with metrics.stage("prompt_prefix_register"):
+                    handle = self.backend.create(self.model_name, display_name, text, self.ttl)
+                metrics.inc("prompt_prefix_registrations_total")
+            else:
+                self.backend.extend(handle, self.ttl)
+            model = self.backend.model_for(handle)
+        except Exception as e:
+            print(f"⚠️ Prompt prefix {kind} not cached, sending full prompts: {e}")
+            self._entries[kind] = {"key": key, "handle": None, "model": None, "expires": now + RETRY_FAILED_SECONDS}
+            return None
+        self._entries[kind] = {"key": key, "handle": handle, "model": model, "expires": now + self.ttl}
+        return model
+
+    def clear(self):
+        """Delete every registered prefix (e.g. on shutdown)."""
+        entries, self._entries = self._entries, {}
+        for entry in entries.values():
+            if entry["handle"] is not None:
+                try:
+                    self.backend.delete(entry["handle"])
+                except Exception:
+                    pass
@@ -0,0 +1,172 @@
+import os
+import json
+import threading
+from dotenv import load_dotenv
+
+# Process-wide, lazily built singletons. Heavy libraries (langchain, sentence-transformers,
+# FAISS, google.generativeai, google.cloud.vision) are imported only when first needed.
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+GEMINI_MODEL = "models/gemini-2.5-pro"
+GEMINI_TOKENIZER_MODEL = "gemini-1.5-pro-002"  # Local SentencePiece tokenizer shared by current Gemini models
+INDEX_DIR = "faiss_index"
+VISION_CREDENTIALS = "obesity-bot-train-00c737889aa7.json"
+
+# 🌍 Load env vars and API keys
+load_dotenv()
+
+# Which prebuilt index to serve (see vector_store.INDEX_TYPE) and its query-time knobs,
+# e.g. FAISS_SEARCH_PARAMS='{"nprobe": 16}' for ivf or '{"efSearch": 64}' for hnsw.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_SEARCH_PARAMS = json.loads(os.getenv("FAISS_SEARCH_PARAMS") or "{}")
+# Legacy index.pkl indexes are only unpickled with FAISS_ALLOW_PICKLE=1 (convert them instead)
+FAISS_ALLOW_PICKLE = os.getenv("FAISS_ALLOW_PICKLE") == "1"
+# Register the static prompt prefixes with Gemini context caching (see prompts.py). Off ("0") by default:
+# instructions + website summary alone are far below prompts.PREFIX_MIN_TOKENS, so only "corpus" caches
+# anything (the whole docs corpus too, retrieval skipped; cache storage is billed). "1" caches
+# instructions + website summary with docs retrieved per request, once that prefix is large enough.
+PROMPT_CACHE = os.getenv("GEMINI_PROMPT_CACHE", "0")
+PROMPT_CACHE_CORPUS = PROMPT_CACHE == "corpus"
+
+_instances = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _get(name, factory):
+    """Return the cached instance for name, building it once even under concurrent callers."""
+    if name in _instances:
+        return _instances[name]
+    with _locks_guard:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _instances:
+            _instances[name] = factory()
+    return _instances[name]
+
+def _build_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+def _build_vectorstore():
+    try:
+        from index_storage import load_vectorstore
+        return load_vectorstore(INDEX_DIR, get_embeddings(), index_type=FAISS_INDEX_TYPE,
+                                search_params=FAISS_SEARCH_PARAMS, allow_pickle=FAISS_ALLOW_PICKLE)
+    except Exception as e:
+        print("❌ FAISS index not found or failed to load. Please build and upload the faiss_index folder (python vector_store.py).")
+        print(f"Error details: {e}")
+        return None
+
+def _build_model():
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def _build_scheduler():
+    from gemini_scheduler import GeminiScheduler
+    return GeminiScheduler()  # Limits from GEMINI_WORKERS / GEMINI_RPM / GEMINI_TPM
+
+def _build_prompt_cache():
+    if PROMPT_CACHE == "0":
+        return None
+    import importlib.util
+    try:
+        if importlib.util.find_spec("google.generativeai.caching") is None:  # google-generativeai < 0.7
+            return None
+    except ImportError:
+        return None
+    from prompts import GeminiContextCache, PrefixCache
+    get_model()  # Configures the API key
+    return PrefixCache(GeminiContextCache(), GEMINI_MODEL, count_tokens=get_token_counter())
+
+def _build_vision_client():
+    from google.cloud import vision
+    os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", VISION_CREDENTIALS)
+    return vision.ImageAnnotatorClient()
+
+def _build_token_counter():
+    """Token counter for prompt budgets: Gemini's own tokenizer when the Vertex AI SDK is installed,
+    else the embedding model's tokenizer (installed with sentence-transformers), else the char estimate."""
+    try:
+        from vertexai.preview import tokenization
+        tokenizer = tokenization.get_tokenizer_for_model(GEMINI_TOKENIZER_MODEL)
+        count = lambda text: tokenizer.count_tokens(text).total_tokens
+    except Exception:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{EMBEDDING_MODEL}")
+            tokenizer.model_max_length = 1 << 30  # Counting only; silences the 512-token warning
+            count = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            from retrieval import estimate_tokens
+            print(f"⚠️ No tokenizer available, estimating tokens from length: {e}")
+            count = estimate_tokens
+    return count
+
+def _build_answer_cache():
+    # Semantic answer cache for repeated questions (cleared automatically when the index is rebuilt)
+    if get_vectorstore() is None:
+        return None
+    from semantic_cache import SemanticCache
+    return SemanticCache(get_embeddings())
+
+def get_embeddings():
+    return _get("embeddings", _build_embeddings)
+
+def get_vectorstore():
+    """The loaded FAISS store, or None if the index is missing or broken."""
+    return _get("vectorstore", _build_vectorstore)
+
+def get_model():
+    return _get("model", _build_model)
+
+def get_scheduler():
+    """The process-wide Gemini request scheduler (rate limits, priorities, retries)."""
+    return _get("scheduler", _build_scheduler)
+
+def get_prompt_cache():
+    """PrefixCache for static prompt prefixes, or None when context caching is off or unavailable."""
+    return _get("prompt_cache", _build_prompt_cache)
+
+def get_vision_client():
+    return _get("vision_client", _build_vision_client)
+
+def get_token_counter():
+    """count(text) -> tokens. Not memoized: callers pass whole prompts and chat history, and a local
+    tokenizer pass is cheap next to the Gemini call it budgets."""
+    return _get("token_counter", _build_token_counter)
+
+def get_answer_cache():
+    return _get("answer_cache", _build_answer_cache)
+
+def override(**instances):
+    """Install ready-made instances (e.g. fakes for tests and benchmarks)."""
+    _instances.update(instances)
+
+def reset(*names):
+    """Forget cached instances (all if no names) so they are rebuilt on next use."""
+    for name in names or list(_instances):
+        _instances.pop(name, None)
+
+def warm_up(vision=False):
+    """Build everything the first answer needs, so it does not pay the cold-start cost."""
+    embeddings = get_embeddings()
+    embeddings.embed_query("warm up")  # Loads model weights and tokenizer
+    get_vectorstore()
+    get_answer_cache()
+    get_token_counter()
+    get_model()
+    get_scheduler()
+    if vision:
+        get_vision_client()
+
+def warm_up_async(vision=False):
+    """Start warm_up in a daemon thread; getters wait for in-flight construction instead of duplicating it."""
+    thread = threading.Thread(target=warm_up, kwargs={"vision": vision}, daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    warm_up(vision=True)
+    print(f"✅ Warm-up finished in {time.perf_counter() - start:.2f}s")
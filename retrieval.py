@@ -0,0 +1,189 @@
+import re
+
+TOKEN_ESTIMATE_PER_CHAR = 0.25  # Rough estimate: 1 token ≈ 4 chars (fallback when no tokenizer is installed)
+ROWS_PER_QUERY = 4              # OCR log rows combined into one search query
+K_PER_QUERY = 4                 # Hits fetched per query before merging
+MIN_OVERLAP_CHARS = 20          # Shortest shared edge treated as splitter overlap (chunk_overlap is 150)
+DUPLICATE_SIMILARITY = 0.8      # Word-shingle Jaccard above which a chunk is a near-duplicate
+SHINGLE_WORDS = 3
+SEPARATOR = "\n\n"
+
+def estimate_tokens(text):
+    return int(len(text) * TOKEN_ESTIMATE_PER_CHAR)
+
+def ocr_queries(structured_text, question=None, rows_per_query=ROWS_PER_QUERY):
+    """Build search queries from OCR'd diet-log rows (a few rows per query) and the optional question."""
+    rows = [row.strip() for row in structured_text.split("\n") if row.strip()]
+    queries = [" ".join(rows[i:i + rows_per_query]) for i in range(0, len(rows), rows_per_query)]
+    if question:
+        queries.insert(0, question)
+    return queries
+
+def _embed(vectorstore, queries):
+    embedder = vectorstore.embedding_function
+    if hasattr(embedder, "embed_documents"):
+        return embedder.embed_documents(queries)
+    return [embedder(q) for q in queries]
+
+# --- Context assembly: merge overlapping chunks, drop near-duplicates, rank, pack to a token budget ---
+
+class _Piece:
+    """A stretch of source text made of one or more retrieved chunks."""
+
+    def __init__(self, doc, distance):
+        self.text = doc.page_content
+        self.distance = distance
+        self.hits = [(doc, distance)]
+        self.source = doc.metadata.get("source")
+        self._shingles = None
+
+    @property
+    def docs(self):
+        return [doc for doc, _ in self.hits]
+
+    def absorb(self, other, text):
+        self.text = text
+        self.distance = min(self.distance, other.distance)
+        self.hits.extend(other.hits)
+        self._shingles = None
+
+    @property
+    def shingles(self):
+        if self._shingles is None:
+            words = re.findall(r"\w+", self.text.lower())
+            self._shingles = {tuple(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+        return self._shingles
+
+def _join_overlapping(first, second, min_overlap=MIN_OVERLAP_CHARS):
+    """first + second without the text they share, if second starts where first ends
+    (or one contains the other). None if they are not adjacent."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first[:start] + second
+        start = first.find(probe, start + 1)
+    return None
+
+def _merge_adjacent(pieces):
+    """Merge chunks of the same source whose edges overlap (neighbours from the text splitter).
+    A merged piece is checked again, so a chunk that bridges two others joins all three."""
+    merged = []
+    for piece in pieces:
+        while True:
+            for other in merged:
+                if other.source != piece.source:
+                    continue
+                text = _join_overlapping(other.text, piece.text) or _join_overlapping(piece.text, other.text)
+                if text is not None:
+                    merged.remove(other)
+                    other.absorb(piece, text)
+                    piece = other
+                    break
+            else:
+                merged.append(piece)
+                break
+    return merged
+
+def _similarity(a, b):
+    union = len(a.shingles | b.shingles)
+    return len(a.shingles & b.shingles) / union if union else 0.0
+
+def _relevance(piece):
+    # FAISS IndexFlatL2 returns squared L2; for unit vectors cosine = 1 - d²/2
+    return 1.0 - piece.distance / 2.0
+
+def _rank(pieces, mmr_lambda=None):
+    """Best distance first; with mmr_lambda, maximal marginal relevance against text already picked
+    (1.0 = relevance only, lower values favour chunks that add new text)."""
+    pieces = sorted(pieces, key=lambda p: p.distance)
+    if mmr_lambda is None or len(pieces) < 3:
+        return pieces
+    ranked, rest = [pieces[0]], pieces[1:]
+    while rest:
+        best = max(rest, key=lambda p: mmr_lambda * _relevance(p)
+                   - (1 - mmr_lambda) * max(_similarity(p, q) for q in ranked))
+        ranked.append(best)
+        rest.remove(best)
+    return ranked
+
+def _fit(piece, room, count_tokens, separator_cost, first):
+    """Best-ranked chunks of a merged piece that fit in room tokens, re-joined where they still
+    overlap: ([pieces], cost). A long run of neighbours is cut at chunk boundaries instead of
+    being dropped whole."""
+    kept, pieces, cost = [], [], 0
+    for hit in sorted(piece.hits, key=lambda h: h[1]):
+        trial = _merge_adjacent([_Piece(doc, distance) for doc, distance in kept + [hit]])
+        trial_cost = sum(count_tokens(p.text) for p in trial) + separator_cost * (len(trial) - first)
+        if trial_cost <= room:
+            kept.append(hit)
+            pieces, cost = trial, trial_cost
+    return sorted(pieces, key=lambda p: p.distance), cost
+
+def pack_context(hits, token_budget, count_tokens=estimate_tokens, mmr_lambda=None,
+                 duplicate_similarity=DUPLICATE_SIMILARITY):
+    """Assemble prompt context from [(doc, distance)] search hits.
+    Overlapping neighbours are merged, near-duplicates dropped, the rest ranked (optionally
+    with MMR) and packed until token_budget; a merged piece that does not fit is cut back to
+    its best chunks that do. Returns (context_text, docs) where docs are the
+    retrieved chunks that made it into the text."""
+    best = {}  # page_content -> (distance, doc): the same chunk can come back from several queries
+    for doc, distance in hits:
+        key = doc.page_content
+        if key not in best or distance < best[key][0]:
+            best[key] = (float(distance), doc)
+    pieces = _merge_adjacent([_Piece(doc, distance) for distance, doc in sorted(best.values(), key=lambda hit: hit[0])])
+    picked, used = [], 0
+    separator_cost = count_tokens(SEPARATOR)
+    for piece in _rank(pieces, mmr_lambda):
+        if any(_similarity(piece, other) >= duplicate_similarity for other in picked):
+            continue
+        cost = count_tokens(piece.text) + (separator_cost if picked else 0)
+        if used + cost <= token_budget:
+            picked.append(piece)
+            used += cost
+        elif len(piece.hits) > 1:
+            parts, cost = _fit(piece, token_budget - used, count_tokens, separator_cost, first=not picked)
+            picked.extend(parts)
+            used += cost
+        # else: a smaller chunk further down may still fit
+    return SEPARATOR.join(piece.text for piece in picked), [doc for piece in picked for doc in piece.docs]
+
+def search_many(vectorstore, vectors, k):
+    """[(doc, distance)] hits for every query vector, from one FAISS search call for the whole batch
+    (LangChain's FAISS wrapper only searches one vector at a time)."""
+    import numpy as np
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    if not len(matrix):
+        return []
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(matrix)
+    distances, positions = vectorstore.index.search(matrix, k)
+    results = []
+    for row_distances, row_positions in zip(distances, positions):
+        hits = []
+        for distance, pos in zip(row_distances, row_positions):
+            if pos == -1:
+                continue  # Fewer than k vectors (or probed lists) available
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(pos)])
+            if not isinstance(doc, str):  # Docstores return an error string for unknown ids
+                hits.append((doc, float(distance)))
+        results.append(hits)
+    return results
+
+def retrieve_context(vectorstore, queries, token_budget, k_per_query=K_PER_QUERY, count_tokens=estimate_tokens,
+                     mmr_lambda=None):
+    """Search the index with every query (embedded and searched in one batch) and pack the
+    merged hits into token_budget (see pack_context). Returns (context_text, docs)."""
+    if not queries:
+        return "", []
+    hits = [hit for query_hits in search_many(vectorstore, _embed(vectorstore, queries), k_per_query)
+            for hit in query_hits]
+    return pack_context(hits, token_budget, count_tokens, mmr_lambda)
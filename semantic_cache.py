@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Semantic answer cache: near-identical questions (by embedding) reuse an earlier Gemini answer.
+CACHE_PATH = os.path.join("cache", "semantic_cache.json")
+INDEX_DIR = "faiss_index"
+SIMILARITY_THRESHOLD = 0.92     # Cosine similarity needed for a hit
+MAX_ENTRIES = 500               # LRU capacity
+TTL_SECONDS = 7 * 24 * 60 * 60  # Entries expire after a week
+SAVE_DELAY_SECONDS = 5.0        # Puts within this window are written to disk together
+
+# Questions that lean on earlier turns ("and for dinner?", "is it safe?") are never answered
+# from or stored in the shared cache once a session has history.
+FOLLOW_UP_MAX_WORDS = 3
+FOLLOW_UP_OPENERS = ("and", "also", "but", "so", "then", "what about", "how about", "same",
+                     "aur", "phir", "toh", "to phir", "और", "फिर", "तो")
+FOLLOW_UP_WORDS = {"it", "its", "it's", "this", "that", "these", "those", "they", "them", "their",
+                   "he", "she", "him", "her", "above", "previous", "earlier", "again", "same", "more",
+                   "ye", "yeh", "ya", "woh", "wo", "vo", "iska", "iski", "iske", "uska", "uski", "uske",
+                   "isme", "usme", "inka", "unka", "यह", "ये", "वह", "वो", "इसका", "इसकी", "इसके",
+                   "उसका", "उसकी", "उसके", "इसमें", "उसमें"}
+
+def index_version(index_dir=INDEX_DIR):
+    """Cheap fingerprint of the FAISS index files; changes whenever the index is rebuilt."""
+    parts = []
+    for name in ("index.faiss", "docstore.sqlite", "index.pkl", "manifest.json"):
+        try:
+            st = os.stat(os.path.join(index_dir, name))
+            parts.append(f"{name}:{st.st_size}:{st.st_mtime_ns}")
+        except FileNotFoundError:
+            continue
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def is_follow_up(query):
+    """True if the question probably depends on earlier turns of the conversation."""
+    text = " ".join(query.lower().split())
+    words = [w.strip("?!.,;:'\"()") for w in text.split()]
+    return (len(words) <= FOLLOW_UP_MAX_WORDS
+            or any(text == o or text.startswith(o + " ") for o in FOLLOW_UP_OPENERS)
+            or any(w in FOLLOW_UP_WORDS for w in words))
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+class SemanticCache:
+    """LRU + TTL cache of answers keyed on query embedding, language and index version."""
+
+    def __init__(self, embeddings, path=CACHE_PATH, threshold=SIMILARITY_THRESHOLD,
+                 max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, version_fn=index_version,
+                 save_delay=SAVE_DELAY_SECONDS):
+        self.embeddings = embeddings
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Serialises file writes; never held with _lock
+        self._save_timer = None
+        self._entries = OrderedDict()  # key -> entry dict, least recently used first
+        self._version = version_fn()
+        self._load()
+        atexit.register(self.flush)
+
+    def embed(self, query):
+        return _normalize(self.embeddings.embed_query(query))
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not read semantic cache {self.path}: {e}")
+            return
+        if data.get("version") != self._version:
+            return  # Index changed since the cache was written
+        for key, entry in data.get("entries", []):
+            entry["vector"] = _normalize(entry["vector"])
+            self._entries[key] = entry
+
+    def _schedule_save(self):
+        """Write the cache SAVE_DELAY_SECONDS from now on a background thread (called with _lock held),
+        so answering a question never waits on rewriting the file."""
+        if not self.path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now (also runs at exit)."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            snapshot = list(self._entries.items())
+            version = self._version
+        with self._save_lock:
+            self._save(snapshot, version)
+
+    def _save(self, snapshot, version):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            entries = [[key, dict(entry, vector=entry["vector"].tolist())] for key, entry in snapshot]
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not write semantic cache {self.path}: {e}")
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _expire(self, now):
+        for key in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+            del self._entries[key]
+
+    def lookup(self, query, lang, vector=None):
+        """Return a cached answer for a semantically similar query in the same language, or None."""
+        vector = self.embed(query) if vector is None else _normalize(vector)
+        now = time.time()
+        with self._lock:
+            self._check_version()
+            self._expire(now)
+            best_key, best_sim = None, self.threshold
+            for key, entry in self._entries.items():
+                if entry["lang"] != lang:
+                    continue
+                sim = float(np.dot(vector, entry["vector"]))
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key]["answer"]
+
+    def put(self, query, lang, answer, vector=None):
+        """Store an answer; the file is rewritten shortly after, in the background."""
+        vector = self.embed(query) if vector is None else _normalize(vector)
+        key = hashlib.sha256(f"{lang}\n{query}".encode("utf-8")).hexdigest()
+        with self._lock:
+            self._check_version()
+            self._entries[key] = {"query": query, "lang": lang, "answer": answer,
+                                  "vector": vector, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.flush()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0}
@@ -0,0 +1,85 @@
+import time
+import threading
+from retrieval import estimate_tokens
+
+# Per-session conversation state. Only the user's message and the answer are kept;
+# retrieved docs/website context is rebuilt per turn and never replayed.
+HISTORY_TOKEN_BUDGET = 2000    # Est. tokens of earlier turns replayed to Gemini
+IDLE_TIMEOUT_SECONDS = 30 * 60 # Sessions unused this long are evicted
+MAX_STORED_TURNS = 50          # Hard cap on turns kept per session
+SUMMARY_CHARS = 400            # Size of the note that stands in for trimmed turns
+
+class SessionState:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.turns = []  # (user_text, answer_text), oldest first
+        self.last_used = time.time()
+
+    def add_turn(self, user_text, answer_text):
+        self.turns.append((user_text, answer_text))
+        del self.turns[:-MAX_STORED_TURNS]
+        self.last_used = time.time()
+
+    def history(self, token_budget=HISTORY_TOKEN_BUDGET, count_tokens=estimate_tokens):
+        """Gemini chat history of the newest turns that fit token_budget. Older turns are
+        replaced by one short note listing what the user asked."""
+        kept, used = [], 0
+        for user_text, answer_text in reversed(self.turns):
+            cost = count_tokens(user_text) + count_tokens(answer_text)
+            if used + cost > token_budget:
+                break
+            kept.append((user_text, answer_text))
+            used += cost
+        kept.reverse()
+        history = []
+        dropped = self.turns[:len(self.turns) - len(kept)]
+        if dropped:
+            asked = "; ".join(user_text.splitlines()[0] for user_text, _ in dropped if user_text.strip())
+            note = f"(Earlier in this conversation the user asked: {asked})"[:SUMMARY_CHARS]
+            history.append({"role": "user", "parts": [note]})
+            history.append({"role": "model", "parts": ["Noted."]})
+        for user_text, answer_text in kept:
+            history.append({"role": "user", "parts": [user_text]})
+            history.append({"role": "model", "parts": [answer_text]})
+        return history
+
+class SessionManager:
+    """Hands out one conversation per session id and evicts idle ones."""
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, idle_timeout=IDLE_TIMEOUT_SECONDS):
+        self.token_budget = token_budget
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def evict_idle(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for sid in [sid for sid, s in self._sessions.items() if now - s.last_used > self.idle_timeout]:
+                del self._sessions[sid]
+
+    def get(self, session_id):
+        self.evict_idle()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = SessionState(session_id)
+            session.last_used = time.time()
+            return session
+
+    def start_chat(self, model, session_id):
+        """A fresh Gemini chat seeded with this session's trimmed history."""
+        return model.start_chat(history=self.get(session_id).history(self.token_budget))
+
+    def has_history(self, session_id):
+        return bool(self.get(session_id).turns)
+
+    def record(self, session_id, user_text, answer_text):
+        self.get(session_id).add_turn(user_text, answer_text)
+
+    def reset(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,107 @@
+import numpy as np
+
+# Rebuilds a table (header + cells) from OCR word boxes. Thresholds scale with the median
+# word height, and rows are found after undoing the page skew, so one set of defaults works
+# for small and large handwriting and slightly rotated phone photos.
+ROW_GAP = 0.6    # New row when the deskewed centre-y gap exceeds this × median word height
+CELL_GAP = 1.0   # Words closer than this × median height on one row form one cell
+COLUMN_GAP = 1.5 # Cell left edges further apart than this × median height start a new column
+
+def words_from_vision(text_annotations, page=0):
+    """Word dicts ({"text", "vertices", "page"}) from Vision text_annotations (skips the full-text entry)."""
+    words = []
+    for t in text_annotations[1:]:
+        if t.description.strip():
+            words.append({"text": t.description, "page": page,
+                          "vertices": [[v.x or 0, v.y or 0] for v in t.bounding_poly.vertices]})
+    return words
+
+def _geometry(words):
+    """Per-word arrays: deskewed left/right/centre-y and height, plus the skew angle."""
+    boxes = np.asarray([w["vertices"] for w in words], dtype=np.float64).reshape(-1, 4, 2)
+    top_mid = (boxes[:, 0] + boxes[:, 1]) / 2
+    bottom_mid = (boxes[:, 3] + boxes[:, 2]) / 2
+    heights = np.linalg.norm(bottom_mid - top_mid, axis=1)
+    baseline = boxes[:, 1] - boxes[:, 0]
+    widths = np.linalg.norm(baseline, axis=1)
+    # Skew from the baselines of words wider than tall (single letters give noisy angles)
+    wide = widths > heights
+    angles = np.arctan2(baseline[:, 1], baseline[:, 0])
+    angle = float(np.median(angles[wide])) if wide.any() else 0.0
+    cos, sin = np.cos(-angle), np.sin(-angle)
+    rot = np.array([[cos, -sin], [sin, cos]])
+    flat = boxes.reshape(-1, 2) @ rot.T
+    rotated = flat.reshape(-1, 4, 2)
+    left = rotated[:, :, 0].min(axis=1)
+    right = rotated[:, :, 0].max(axis=1)
+    center_y = rotated[:, :, 1].mean(axis=1)
+    return left, right, center_y, np.maximum(heights, 1.0), angle
+
+def _page_table(words, row_gap=None):
+    """Rows of cells (lists of strings) for the words of one page."""
+    left, right, cy, heights, _ = _geometry(words)
+    h = float(np.median(heights))
+    texts = np.asarray([w["text"] for w in words], dtype=object)
+
+    # Rows: split the y-sorted words wherever the vertical gap is large
+    order = np.argsort(cy, kind="stable")
+    gaps = np.diff(cy[order])
+    row_of_sorted = np.concatenate([[0], np.cumsum(gaps > (row_gap if row_gap is not None else ROW_GAP * h))])
+    row_id = np.empty(len(words), dtype=np.int64)
+    row_id[order] = row_of_sorted
+
+    # Cells: within a row, merge x-sorted words separated by small gaps
+    order = np.lexsort((left, row_id))
+    r, lft, rgt = row_id[order], left[order], right[order]
+    new_cell = np.ones(len(order), dtype=bool)
+    new_cell[1:] = (r[1:] != r[:-1]) | (lft[1:] - rgt[:-1] > CELL_GAP * h)
+    starts = np.flatnonzero(new_cell)
+    cell_row = r[starts]
+    cell_left = lft[starts]
+    cell_text = [" ".join(group) for group in np.split(texts[order], starts[1:])]
+
+    # Columns: 1-D clustering of cell left edges across all rows
+    edges = np.sort(cell_left)
+    breaks = np.flatnonzero(np.diff(edges) > COLUMN_GAP * h)
+    bounds = edges[breaks + 1] if len(breaks) else np.empty(0)
+    cell_col = np.searchsorted(bounds, cell_left, side="right")
+    n_cols = len(bounds) + 1
+
+    n_rows = int(cell_row.max()) + 1 if len(cell_row) else 0
+    table = [[""] * n_cols for _ in range(n_rows)]
+    for row, col, text in zip(cell_row, cell_col, cell_text):
+        table[row][col] = f"{table[row][col]} {text}".strip()
+    return [row for row in table if any(row)]
+
+def reconstruct_table(words, row_gap=None):
+    """Build {"header": [...], "rows": [[...], ...]} from word boxes, possibly spanning pages.
+    Pages are laid out independently; a page that repeats the first page's header row
+    does not add it again. row_gap overrides the adaptive row threshold (pixels)."""
+    pages = {}
+    for w in words:
+        pages.setdefault(w.get("page", 0), []).append(w)
+    header, rows = [], []
+    for page in sorted(pages):
+        table = _page_table(pages[page], row_gap)
+        if not table:
+            continue
+        if not header:
+            header, table = table[0], table[1:]
+        elif table[0] == header:
+            table = table[1:]
+        rows.extend(table)
+    width = max([len(header)] + [len(r) for r in rows]) if header else 0
+    pad = lambda row: row + [""] * (width - len(row))
+    return {"header": pad(header), "rows": [pad(r) for r in rows]}
+
+def table_to_text(table):
+    """Compact pipe-separated text for the prompt: header line, then one line per row."""
+    lines = []
+    if table["header"]:
+        lines.append(" | ".join(table["header"]))
+    lines.extend(" | ".join(row) for row in table["rows"])
+    return "\n".join(lines)
+
+def table_rows(table):
+    """Header and rows as one list of cell lists (the shape older callers expect)."""
+    return ([table["header"]] if table["header"] else []) + table["rows"]
@@ -0,0 +1,61 @@
+"""Shared answer cache: standalone questions hit it in any session, follow-ups never do."""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_rag  # noqa: E402
+import resources  # noqa: E402
+from benchmarks.fakes import FakeEmbeddings, FakeGenerativeModel  # noqa: E402
+from gemini_scheduler import GeminiScheduler  # noqa: E402
+from retrieval import estimate_tokens  # noqa: E402
+from semantic_cache import SemanticCache, is_follow_up  # noqa: E402
+
+class _Index:
+    def similarity_search_with_score_by_vector(self, vector, k=4):
+        doc = SimpleNamespace(page_content="The kit contains 39 herbs.", metadata={"source": "Guide.pdf"})
+        return [(doc, 0.1)]
+
+@pytest.fixture
+def model(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    model = FakeGenerativeModel(latency=0, answer_chunks=1, chunk_delay=0)
+    embeddings = FakeEmbeddings()
+    scheduler = GeminiScheduler(workers=1)
+    resources.override(model=model, scheduler=scheduler, embeddings=embeddings, vectorstore=_Index(),
+                       answer_cache=SemanticCache(embeddings, path=None), prompt_cache=None,
+                       token_counter=estimate_tokens)
+    monkeypatch.setattr(chatbot_rag, "fetch_website_summary", lambda: "Obesity Killer Kit is a natural solution.")
+    monkeypatch.setattr(chatbot_rag, "save_chat", lambda user_msg, bot_msg: None)
+    monkeypatch.setattr(chatbot_rag, "show_feedback_options", lambda: None)
+    monkeypatch.setattr(chatbot_rag, "last_bot_response", None)
+    yield model
+    scheduler.shutdown()
+    resources.reset("model", "scheduler", "embeddings", "vectorstore", "answer_cache", "prompt_cache", "token_counter")
+
+def test_follow_up_detection():
+    assert is_follow_up("and for dinner?")
+    assert is_follow_up("Can I take it with tea?")
+    assert is_follow_up("iska dose kya hai")
+    assert not is_follow_up("How many herbs are in the Obesity Killer Kit?")
+
+def test_standalone_questions_use_cache_after_first_turn(model):
+    ask = chatbot_rag.central_chat_system
+    ask("How many herbs are in the kit?", "en", session_id="a")
+    ask("Can I take it with tea?", "en", session_id="a")  # Follow-up: neither looked up nor stored
+    assert model.calls == 2
+
+    model.answer = "Take it twice daily."
+    ask("What is the daily dose of the kit?", "en", session_id="a")  # Standalone, session has history
+    assert model.calls == 3
+
+    chatbot_rag.last_bot_response = None
+    assert ask("What is the daily dose of the kit?", "en", session_id="b") == "Take it twice daily."
+    assert model.calls == 3
+    assert chatbot_rag.last_bot_response == "Take it twice daily."  # /save works after a cache hit
+
+    ask("Can I take it with tea?", "en", session_id="b")
+    assert model.calls == 4
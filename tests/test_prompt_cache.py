@@ -0,0 +1,112 @@
+"""Prompt prefix caching against a local stand-in for Gemini context caching: registration, reuse,
+re-registration when the sources change, corpus mode and prefixes too small to cache."""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_rag  # noqa: E402
+import prompts  # noqa: E402
+import resources  # noqa: E402
+from benchmarks.fakes import FakeCachedModel, FakeContextCache, FakeEmbeddings, FakeGenerativeModel  # noqa: E402
+from gemini_scheduler import GeminiScheduler  # noqa: E402
+from retrieval import estimate_tokens  # noqa: E402
+
+PREFIX = "Use only the info below to answer the user. " * 20
+
+class _Sources:
+    """Fingerprint of docs/ and the index, changed by hand."""
+
+    def __init__(self):
+        self.version = 1
+
+    def __call__(self):
+        return f"sources-{self.version}"
+
+class _Build:
+    def __init__(self, text=PREFIX):
+        self.text = text
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.text
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(prompts, "FINGERPRINT_CHECK_SECONDS", 0)
+    base = FakeGenerativeModel(latency=0, chunk_delay=0)
+    backend = FakeContextCache(base)
+    sources = _Sources()
+    prefix_cache = prompts.PrefixCache(backend, "gemini-test", count_tokens=estimate_tokens,
+                                       fingerprint_fn=sources, min_tokens=100)
+    return SimpleNamespace(base=base, backend=backend, sources=sources, prefix_cache=prefix_cache)
+
+def test_prefix_is_registered_and_answers_with_it(cache):
+    model = cache.prefix_cache.model_for("qa", _Build())
+    assert isinstance(model, FakeCachedModel)
+    assert cache.backend.created == 1
+    response = model.generate_content("User: Is tea allowed?")
+    assert cache.base.prompts[-1] == PREFIX + "User: Is tea allowed?"
+    assert response.usage_metadata.cached_content_token_count == len(PREFIX) // 4
+
+def test_second_call_reuses_model_without_backend_calls(cache):
+    build = _Build()
+    first = cache.prefix_cache.model_for("qa", build)
+    assert cache.prefix_cache.model_for("qa", build) is first
+    assert build.calls == 1
+    assert (cache.backend.finds, cache.backend.created) == (1, 1)
+
+def test_changed_sources_reregister_and_delete_old_prefix(cache):
+    first = cache.prefix_cache.model_for("qa", _Build())
+    cache.sources.version += 1
+    second = cache.prefix_cache.model_for("qa", _Build(PREFIX + "New guide. " * 10))
+    assert second is not first and "New guide." in second.prefix
+    assert (cache.backend.created, cache.backend.deleted) == (2, 1)
+    assert [h.text for h in cache.backend.live.values()] == [second.prefix]
+
+def test_prefix_below_minimum_is_never_sent_to_backend(cache):
+    build = _Build("Use only the info below.")
+    assert cache.prefix_cache.model_for("qa", build) is None
+    assert cache.prefix_cache.model_for("qa", build) is None
+    assert build.calls == 1  # Not rebuilt or retried until the sources change
+    assert (cache.backend.finds, cache.backend.created) == (0, 0)
+
+class _Index:
+    def __init__(self):
+        self.searches = 0
+
+    def similarity_search_with_score_by_vector(self, vector, k=4):
+        self.searches += 1
+        return [(SimpleNamespace(page_content="Drink warm water.", metadata={"source": "Guide.pdf"}), 0.1)]
+
+def test_corpus_mode_sends_only_the_question(cache, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    site = "Obesity Killer Kit is a natural solution."
+    corpus = "Rule: drink warm water before every meal. " * 40
+    index = _Index()
+    scheduler = GeminiScheduler(workers=1, requests_per_minute=0, tokens_per_minute=0)
+    resources.override(model=cache.base, scheduler=scheduler, embeddings=FakeEmbeddings(), vectorstore=index,
+                       answer_cache=None, prompt_cache=cache.prefix_cache, token_counter=estimate_tokens)
+    monkeypatch.setattr(resources, "PROMPT_CACHE", "corpus")
+    monkeypatch.setattr(resources, "PROMPT_CACHE_CORPUS", True)
+    monkeypatch.setattr(chatbot_rag, "load_corpus", lambda: corpus)
+    monkeypatch.setattr(chatbot_rag, "fetch_website_summary", lambda: site)
+    monkeypatch.setattr(chatbot_rag, "save_chat", lambda user_msg, bot_msg: None)
+    monkeypatch.setattr(chatbot_rag, "show_feedback_options", lambda: None)
+    try:
+        for session_id in ("a", "b"):
+            assert chatbot_rag.central_chat_system("Is tea allowed?", "en", session_id=session_id) == cache.base.answer
+    finally:
+        scheduler.shutdown()
+        resources.reset("model", "scheduler", "embeddings", "vectorstore", "answer_cache", "prompt_cache",
+                        "token_counter")
+
+    assert index.searches == 0
+    assert cache.backend.created == 1
+    (handle,) = cache.backend.live.values()
+    assert handle.text == prompts.qa_prefix(site, corpus)
+    assert cache.base.prompts == [handle.text + prompts.qa_suffix("Is tea allowed?", "en")] * 2
@@ -0,0 +1,29 @@
+"""Context packing keeps the best hits even when their merged text exceeds the budget."""
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval import estimate_tokens, pack_context  # noqa: E402
+
+def _doc(text, source):
+    return SimpleNamespace(page_content=text, metadata={"source": source})
+
+def _guide_chunks(n=6, size=1000, overlap=150):
+    """Adjacent splitter chunks of one document: each starts `overlap` chars before the last ended."""
+    text = " ".join(f"tip{i} drink warm water walk daily" for i in range(1000))
+    return [text[i * (size - overlap):i * (size - overlap) + size] for i in range(n)]
+
+def test_long_run_of_neighbours_is_cut_not_dropped():
+    chunks = _guide_chunks()
+    hits = [(_doc(chunk, "Guide.pdf"), 0.2 + 0.01 * i) for i, chunk in enumerate(chunks)]
+    hits.append((_doc("Take the kit twice daily with warm water. " * 5, "faq.csv"), 0.9))
+    assert estimate_tokens(chunks[0][:150] + "".join(c[150:] for c in chunks)) > 1200  # Merged run cannot fit
+
+    context, docs = pack_context(hits, 1200, estimate_tokens)
+
+    assert estimate_tokens(context) <= 1200
+    guide = [doc.page_content for doc in docs if doc.metadata["source"] == "Guide.pdf"]
+    assert guide[:len(chunks) - 1] == chunks[:-1]  # Best-ranked chunks kept, the lowest-ranked one cut
+    assert chunks[0] in context and chunks[1][150:] in context
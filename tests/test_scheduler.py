@@ -0,0 +1,128 @@
+"""Gemini scheduler: priorities, retries, deadlines and the per-minute window, against a fake Gemini."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeAPIError, FakeGenerativeModel  # noqa: E402
+from gemini_scheduler import (BATCH, INTERACTIVE, WINDOW_SECONDS, DeadlineExceeded,  # noqa: E402
+                              GeminiScheduler, TokenBucket)
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("requests_per_minute", 0)
+        kwargs.setdefault("tokens_per_minute", 0)
+        scheduler = GeminiScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+def _ask(model, name=""):
+    return lambda timeout: model.generate_content(name)
+
+def _block(scheduler):
+    """Occupy the (single) worker until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def hold(timeout):
+        started.set()
+        release.wait(5)
+    scheduler.submit(hold)
+    assert started.wait(5)
+    return release
+
+def test_interactive_jobs_run_before_queued_batch_jobs(make_scheduler):
+    scheduler = make_scheduler(workers=1)
+    model = FakeGenerativeModel(latency=0, chunk_delay=0)
+    release = _block(scheduler)
+    futures = [scheduler.submit(_ask(model, "batch-1"), priority=BATCH),
+               scheduler.submit(_ask(model, "batch-2"), priority=BATCH),
+               scheduler.submit(_ask(model, "chat"), priority=INTERACTIVE)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert model.prompts == ["chat", "batch-1", "batch-2"]
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_retryable_errors_stop_at_max_retries(make_scheduler, code):
+    sleeps = []
+    scheduler = make_scheduler(workers=1, max_retries=3, backoff=lambda attempt: 0.5 * 2 ** attempt,
+                               sleep=sleeps.append)
+    model = FakeGenerativeModel(latency=0, chunk_delay=0, fail_every=1, error=FakeAPIError(code))
+    with pytest.raises(FakeAPIError):
+        scheduler.call(_ask(model), timeout=30)
+    assert model.calls == 4  # First attempt + 3 retries
+    assert sleeps == [0.5, 1.0, 2.0]
+
+def test_retry_succeeds_after_transient_error(make_scheduler):
+    sleeps = []
+    scheduler = make_scheduler(workers=1, backoff=lambda attempt: 0.1, sleep=sleeps.append)
+    model = FakeGenerativeModel(latency=0, chunk_delay=0, fail_every=2, error=FakeAPIError(429))
+    scheduler.call(_ask(model))
+    assert scheduler.call(_ask(model)).text == model.answer  # Second call fails once, then succeeds
+    assert model.calls == 3 and sleeps == [0.1]
+
+def test_non_retryable_errors_pass_through(make_scheduler):
+    sleeps = []
+    scheduler = make_scheduler(workers=1, backoff=lambda attempt: 0.1, sleep=sleeps.append)
+    model = FakeGenerativeModel(latency=0, chunk_delay=0, fail_every=1, error=FakeAPIError(400, "Bad request"))
+    with pytest.raises(FakeAPIError) as error:
+        scheduler.call(_ask(model))
+    assert error.value.code == 400
+    assert model.calls == 1 and sleeps == []
+
+def test_queued_job_past_its_deadline_is_dropped_and_its_slot_refunded(make_scheduler):
+    scheduler = make_scheduler(workers=1, requests_per_minute=60)
+    model = FakeGenerativeModel(latency=0, chunk_delay=0)
+    release = _block(scheduler)
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(_ask(model), timeout=0.2)
+    release.set()
+    scheduler.call(_ask(model, "after"), timeout=5)
+    assert model.prompts == ["after"]  # The expired job never reached Gemini
+    assert scheduler.requests._window_total == 2  # Blocking job + "after"; the expired job's slot came back
+
+def test_job_that_cannot_get_a_slot_in_time_raises_deadline_exceeded(make_scheduler):
+    scheduler = make_scheduler(workers=1, requests_per_minute=60)  # Burst of 2, then one per second
+    model = FakeGenerativeModel(latency=0, chunk_delay=0)
+    scheduler.call(_ask(model))
+    scheduler.call(_ask(model))
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(_ask(model), timeout=0.3)
+    assert model.calls == 2
+
+def test_bucket_never_grants_more_than_limit_in_any_window():
+    clock = _Clock()
+    bucket = TokenBucket(30, burst_seconds=10, clock=clock)  # 5-call burst on top of the refill
+    granted = []
+    for _ in range(int(5 * WINDOW_SECONDS * 10)):  # Ask every 0.1 s for five minutes
+        while bucket.take(1, deadline=clock.now):
+            granted.append(clock.now)
+        clock.now += 0.1
+    assert len(granted) >= 4 * 30  # The limiter still lets the full rate through
+    for start in granted:
+        in_window = [t for t in granted if start <= t < start + WINDOW_SECONDS]
+        assert len(in_window) <= 30
+
+def test_refunds_release_window_capacity():
+    clock = _Clock()
+    bucket = TokenBucket(2, burst_seconds=60, clock=clock)
+    assert bucket.take(1, deadline=clock.now) and bucket.take(1, deadline=clock.now)
+    assert not bucket.take(1, deadline=clock.now)
+    bucket.debit(-1)
+    assert bucket.take(1, deadline=clock.now)
@@ -0,0 +1,62 @@
+"""Time to first token: streamed answers reach the caller before Gemini has finished, and the
+turn is logged once, after the last chunk."""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_rag  # noqa: E402
+import resources  # noqa: E402
+from benchmarks.fakes import FakeEmbeddings, FakeGenerativeModel  # noqa: E402
+from gemini_scheduler import GeminiScheduler  # noqa: E402
+from retrieval import estimate_tokens  # noqa: E402
+
+CHUNKS = 6
+CHUNK_DELAY = 0.05
+
+class _Index:
+    """Vector store stand-in: the QA path only needs one similarity search."""
+
+    def similarity_search_with_score_by_vector(self, vector, k=4):
+        doc = SimpleNamespace(page_content="Drink warm water before meals.", metadata={"source": "Guide.pdf", "page": 3})
+        return [(doc, 0.1)]
+
+@pytest.fixture
+def fake_gemini(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # metrics/ and cache/ are written relative to the working directory
+    model = FakeGenerativeModel(latency=0.01, answer_chunks=CHUNKS, chunk_delay=CHUNK_DELAY)
+    scheduler = GeminiScheduler(workers=1)
+    resources.override(model=model, scheduler=scheduler, embeddings=FakeEmbeddings(), vectorstore=_Index(),
+                       answer_cache=None, prompt_cache=None, token_counter=estimate_tokens)
+    monkeypatch.setattr(chatbot_rag, "fetch_website_summary", lambda: "Obesity Killer Kit is a natural solution.")
+    yield model
+    scheduler.shutdown()
+    resources.reset("model", "scheduler", "embeddings", "vectorstore", "answer_cache", "prompt_cache", "token_counter")
+
+def test_first_delta_arrives_before_stream_completes(fake_gemini, monkeypatch):
+    events = []
+    finish_turn = chatbot_rag.finish_turn
+
+    def recording_finish_turn(*args, **kwargs):
+        events.append("finish_turn")
+        return finish_turn(*args, **kwargs)
+    monkeypatch.setattr(chatbot_rag, "finish_turn", recording_finish_turn)
+    monkeypatch.setattr(chatbot_rag, "save_chat", lambda user_msg, bot_msg: events.append(("save_chat", bot_msg)))
+
+    start = time.perf_counter()
+    stream = chatbot_rag.central_chat_system_stream("How much water should I drink?", "en", session_id="ttft")
+    first = next(stream)
+    first_token_s = time.perf_counter() - start
+    assert first
+    assert events == []  # Nothing is logged while the answer is still streaming
+
+    rest = list(stream)
+    total_s = time.perf_counter() - start
+    assert len(rest) >= CHUNKS - 2
+    assert "".join([first] + rest) == fake_gemini.answer
+    assert total_s - first_token_s >= (len(rest) - 1) * CHUNK_DELAY
+    assert events == ["finish_turn", ("save_chat", fake_gemini.answer)]
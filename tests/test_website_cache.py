@@ -0,0 +1,103 @@
+"""Website knowledge cache against a local stub HTTP server: fetch + extract, TTL,
+stale-while-revalidate, last-good-copy fallback and the built-in summary on a fresh deploy."""
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("requests")
+import website_cache  # noqa: E402
+
+PAGE = """<html><head><title>Kit</title><meta name="description" content="Natural weight loss kit.">
+<style>body {{ color: red }}</style><script>var tracking = 1;</script></head>
+<body><nav>Home | Shop</nav><h1>Obesity Killer Kit</h1><p>{body}</p><footer>© 2024</footer></body></html>"""
+
+class _Site:
+    def __init__(self):
+        self.body = "Contains 39 herbs."
+        self.status = 200
+        self.delay = 0.0
+        self.hits = 0
+
+@pytest.fixture
+def site(monkeypatch, tmp_path):
+    state = _Site()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.hits += 1
+            time.sleep(state.delay)
+            body = PAGE.format(body=state.body).encode("utf-8")
+            self.send_response(state.status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(website_cache, "_entries", {})
+    monkeypatch.setattr(website_cache, "_refreshing", set())
+    monkeypatch.setattr(website_cache, "_failed_at", {})
+    state.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    state.path = str(tmp_path / "website_summary.json")
+    yield state
+    server.shutdown()
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_refresh_extracts_page_text(site):
+    assert website_cache.refresh(site.url, site.path, timeout=2)
+    text = website_cache.get_website_summary(site.url, site.path)
+    assert text == "Natural weight loss kit. Obesity Killer Kit Contains 39 herbs."
+    assert site.hits == 1
+
+def test_fresh_copy_is_served_without_fetching(site):
+    website_cache.refresh(site.url, site.path, timeout=2)
+    site.body = "Changed."
+    for _ in range(3):
+        assert "39 herbs" in website_cache.get_website_summary(site.url, site.path, ttl=60)
+    assert site.hits == 1
+
+def test_stale_copy_is_served_while_refreshing_in_background(site):
+    website_cache.refresh(site.url, site.path, timeout=2)
+    site.body, site.delay = "Now with 40 herbs.", 0.5
+    start = time.monotonic()
+    assert "39 herbs" in website_cache.get_website_summary(site.url, site.path, ttl=0)
+    assert time.monotonic() - start < 0.25  # Did not wait for the slow site
+    assert _wait_for(lambda: "40 herbs" in website_cache.get_website_summary(site.url, site.path, ttl=60))
+
+def test_failed_fetch_keeps_last_good_copy(site):
+    website_cache.refresh(site.url, site.path, timeout=2)
+    site.status = 500
+    assert not website_cache.refresh(site.url, site.path, timeout=2)
+    assert "39 herbs" in website_cache.get_website_summary(site.url, site.path, ttl=60)
+
+def test_on_disk_copy_survives_restart(site, monkeypatch):
+    website_cache.refresh(site.url, site.path, timeout=2)
+    monkeypatch.setattr(website_cache, "_entries", {})  # New process
+    site.status = 500
+    assert "39 herbs" in website_cache.get_website_summary(site.url, site.path, ttl=60)
+    assert site.hits == 1
+
+def test_no_copy_serves_builtin_summary_and_does_not_block(site):
+    site.status, site.delay = 500, 0.5
+    start = time.monotonic()
+    assert website_cache.get_website_summary(site.url, site.path, timeout=2) == website_cache.WEBSITE_SUMMARY
+    assert time.monotonic() - start < 0.25
+    assert _wait_for(lambda: site.url in website_cache._failed_at)
+    website_cache.get_website_summary(site.url, site.path)
+    time.sleep(0.1)
+    assert site.hits == 1  # Failed fetches are retried after RETRY_SECONDS, not on every turn
@@ -1,31 +1,197 @@
 import os
+import json
+import hashlib
+from itertools import groupby
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
-from load_docs import load_docs_from_folder
+from index_storage import INDEX_TYPES, load_mutable_vectorstore, save_index, save_ann_index
+from load_docs import list_doc_files, iter_doc_records
+from resources import EMBEDDING_MODEL, FAISS_INDEX_TYPE, get_embeddings
 
-def create_faiss_index(doc_folder="docs"):
-    """Load documents, split into chunks, embed, and save FAISS index. Does not skip if content is empty."""
+INDEX_DIR = "faiss_index"
+MANIFEST_FILE = "manifest.json"
+CHUNK_SIZE = 1000        # Increased for more context
+CHUNK_OVERLAP = 150
+EMBED_BATCH_SIZE = 64    # Chunks per embedding call
+# Extra approximate index built next to the flat one: flat, ivf, hnsw, sq8, pq or ivfpq
+# (compare them with benchmarks/bench_index.py). The flat index stays the source of truth
+# for incremental updates; the approximate one is retrained from its vectors on every build.
+INDEX_TYPE = FAISS_INDEX_TYPE
+
+def file_hash(path):
+    """SHA-256 of a file's bytes, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def chunk_id(source, text):
+    """Stable docstore id for a chunk: hash of its source file and content."""
+    return hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()
+
+def _settings():
+    return {"embedding_model": EMBEDDING_MODEL, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+            "chunking": "records-v1"}
+
+def load_manifest(index_dir=INDEX_DIR):
+    """Return the build manifest ({} if missing or unreadable)."""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def chunk_records(records, splitter, chunk_size=CHUNK_SIZE):
+    """Turn one file's DocRecords into (text, metadata) chunks.
+    Long pages are split with the splitter; short records (e.g. spreadsheet rows)
+    are packed together up to chunk_size. Metadata keeps the source and first page/row."""
+    buffer, meta, size = [], None, 0
+    for record in records:
+        fits = size + len(record.text) + 1 <= chunk_size
+        if buffer and (len(record.text) > chunk_size or not fits):
+            yield "\n".join(buffer), meta
+            buffer, meta, size = [], None, 0
+        if len(record.text) > chunk_size:
+            for text in splitter.split_text(record.text):
+                yield text, {"source": record.source, "page": record.page}
+            continue
+        if not buffer:
+            meta = {"source": record.source, "page": record.page}
+        buffer.append(record.text)
+        size += len(record.text) + 1
+    if buffer:
+        yield "\n".join(buffer), meta
+
+class _BatchAdder:
+    """Collects new chunks and embeds/adds them to the store EMBED_BATCH_SIZE at a time."""
+
+    def __init__(self, vectorstore, embeddings, batch_size=EMBED_BATCH_SIZE):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.batch = []   # (chunk_id, text, metadata)
+        self.added = 0
+
+    def add(self, cid, text, metadata):
+        self.batch.append((cid, text, metadata))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        texts = [text for _, text, _ in self.batch]
+        vectors = self.embeddings.embed_documents(texts)
+        self.vectorstore.add_embeddings(
+            list(zip(texts, vectors)),
+            metadatas=[meta for _, _, meta in self.batch],
+            ids=[cid for cid, _, _ in self.batch],
+        )
+        self.added += len(self.batch)
+        self.batch = []
+
+def _empty_store(embeddings):
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    dim = len(embeddings.embed_query("dimension probe"))
+    return FAISS(embedding_function=embeddings, index=faiss.IndexFlatL2(dim),
+                 docstore=InMemoryDocstore(), index_to_docstore_id={})
+
+def create_faiss_index(doc_folder="docs", index_dir=INDEX_DIR, full_rebuild=False, index_type=INDEX_TYPE):
+    """Bring the FAISS index in line with doc_folder, embedding only new or changed chunks.
+    A manifest of file and chunk hashes next to the index records what is already embedded;
+    vectors of removed chunks are deleted. Does not skip if content is empty."""
     print("📄 Loading and processing documents...")
 
-    all_text = load_docs_from_folder(doc_folder)
-    if not all_text.strip():
+    files = list_doc_files(doc_folder)
+    if not files:
         print(f"⚠️ Warning: No text loaded from folder: {doc_folder}. Proceeding to create an (empty) index.")
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,        # Increased for more context
-        chunk_overlap=150
-    )
-    chunks = splitter.split_text(all_text)
-    print(f"🧩 Total chunks created: {len(chunks)}")
+    embeddings = get_embeddings()
+    manifest = load_manifest(index_dir)
+    vectorstore = None
+    if not full_rebuild and manifest.get("settings") == _settings():
+        try:
+            vectorstore = load_mutable_vectorstore(index_dir, embeddings)
+        except Exception as e:
+            print(f"⚠️ Existing index could not be loaded, rebuilding from scratch: {e}")
+    old_files = manifest.get("files", {}) if vectorstore is not None else {}
+
+    if vectorstore is None:
+        vectorstore = _empty_store(embeddings)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    new_files = {}
+    changed = {}      # source -> (path, digest)
+    for path in files:
+        source = os.path.basename(path)
+        digest = file_hash(path)
+        old = old_files.get(source)
+        if old and old.get("hash") == digest:
+            new_files[source] = old
+        else:
+            changed[source] = (path, digest)
+    to_delete = set()
+    for source, old in old_files.items():
+        if source not in new_files and source not in changed:
+            to_delete.update(old["chunks"])
+    print(f"🧩 Unchanged files: {len(new_files)} | changed or new files: {len(changed)}")
+
+    # Stream records of changed files (parsed in parallel), chunk per file, embed in batches.
+    adder = _BatchAdder(vectorstore, embeddings)
+    records = iter_doc_records([path for path, _ in changed.values()])
+    for source, file_records in groupby(records, key=lambda r: r.source):
+        path, digest = changed[source]
+        old_ids = set(old_files.get(source, {}).get("chunks", []))
+        new_ids, seen = [], set()
+        for text, metadata in chunk_records(file_records, splitter):
+            cid = chunk_id(source, text)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            new_ids.append(cid)
+            if cid not in old_ids:
+                adder.add(cid, text, metadata)
+        to_delete.update(old_ids - seen)
+        new_files[source] = {"hash": digest, "chunks": new_ids}
+    adder.flush()
+    for source, (path, digest) in changed.items():
+        if source not in new_files:  # Changed file that yielded no text
+            to_delete.update(old_files.get(source, {}).get("chunks", []))
+            new_files[source] = {"hash": digest, "chunks": []}
+    if to_delete:
+        vectorstore.delete(list(to_delete))
 
-    # Always proceed, even if chunks is empty
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    total = sum(len(f["chunks"]) for f in new_files.values())
+    print(f"🧩 Total chunks: {total} | embedded: {adder.added} | deleted: {len(to_delete)}")
 
-    print("💾 Building FAISS index...")
-    vectorstore = FAISS.from_texts(chunks, embedding=embeddings)
-    vectorstore.save_local("faiss_index")
-    print("✅ FAISS index saved successfully.")
+    save_index(vectorstore, index_dir)  # mmap-able index.faiss + docstore.sqlite (no pickle)
+    built = ["flat"]
+    if index_type != "flat":
+        try:
+            save_ann_index(vectorstore, index_dir, index_type)
+            built.append(index_type)
+        except Exception as e:
+            print(f"⚠️ Could not build the {index_type} index, serving will use the flat one: {e}")
+    _save_manifest(index_dir, {"settings": _settings(), "index_types": built, "files": new_files})
+    print(f"✅ FAISS index saved successfully ({', '.join(built)}).")
+    return vectorstore
 
 if __name__ == "__main__":
-    create_faiss_index()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or update the FAISS index from docs/.")
+    parser.add_argument("--full", action="store_true", help="rebuild from scratch")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=list(INDEX_TYPES))
+    args = parser.parse_args()
+    create_faiss_index(full_rebuild=args.full, index_type=args.index_type)
@@ -1,18 +1,37 @@
 import streamlit as st
-from langdetect import detect
-import os
-from chatbot_rag import central_chat_system
+import uuid
+from chatbot_rag import central_chat_system_stream, detect_lang
+import resources
+import metrics
 
 st.set_page_config(page_title="Health Chatbot", page_icon="🤖")
+
+@st.cache_resource
+def start_warm_up():
+    # Runs once per server process: load models/index in the background while the page renders
+    metrics.start_http_server_from_env()
+    metrics.start_file_writer()
+    return resources.warm_up_async()
+
+start_warm_up()
 st.title("🤖 Health Chatbot")
 st.write("Ask anything about your health, diet, or the Obesity Killer kit.")
 st.write("Upload a diet log image and ask a question, or just chat.")
 
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # Own Gemini conversation per browser session
 
-def handle_user_input(user_input, lang):
-    response = central_chat_system(user_input, lang)
+def handle_user_input(user_input, lang, images=None):
+    # Render tokens as they arrive; the full answer is added to the history afterwards
+    live = st.empty()
+    with live.container():
+        st.markdown(f"**You:** {user_input}")
+        response = st.write_stream(central_chat_system_stream(user_input, lang, st.session_state.session_id, images))
+    live.empty()
+    if isinstance(response, list):
+        response = "".join(str(part) for part in response)
     if response:
         st.session_state.chat_history.append(("user", user_input))
         st.session_state.chat_history.append(("bot", response))
@@ -20,28 +39,21 @@ def handle_user_input(user_input, lang):
 # Chat input
 user_input = st.text_input("Type your message:", key="user_input")
 if st.button("Send", key="send_btn") and user_input.strip():
-    try:
-        lang = detect(user_input)
-    except:
-        lang = "en"
+    lang = detect_lang(user_input, st.session_state.session_id)
     handle_user_input(user_input, lang)
 
 # Image upload
-uploaded_file = st.file_uploader("Upload a diet log image (jpg/png)", type=["jpg", "jpeg", "png"])
+uploaded_files = st.file_uploader("Upload a diet log image (jpg/png), several for multi-page logs",
+                                  type=["jpg", "jpeg", "png"], accept_multiple_files=True)
 question = st.text_input("Ask a question about the uploaded image (optional):", key="img_question")
-if uploaded_file and st.button("Analyze Image", key="analyze_btn"):
-    image_path = f"temp_{uploaded_file.name}"
-    with open(image_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    user_input = f"image: {image_path}"
+if uploaded_files and st.button("Analyze Image", key="analyze_btn"):
+    # Images go to OCR as in-memory bytes; nothing is written to disk here
+    images = [(f.name, f.getvalue()) for f in uploaded_files]
+    user_input = "image: " + ", ".join(name for name, _ in images)
     if question.strip():
         user_input += f" | {question.strip()}"
-    try:
-        lang = detect(question) if question.strip() else "en"
-    except:
-        lang = "en"
-    handle_user_input(user_input, lang)
-    os.remove(image_path)
+    lang = detect_lang(question, st.session_state.session_id) if question.strip() else "en"
+    handle_user_input(user_input, lang, images)
 
 # Display chat history
 st.markdown("---")
@@ -0,0 +1,131 @@
+import os
+import json
+import re
+import time
+import threading
+from html.parser import HTMLParser
+
+# Website knowledge source: cached in memory and on disk, refreshed in the background.
+WEBSITE_URL = "https://theobesitykiller.com/"
+WEBSITE_SUMMARY = ("Obesity Killer Kit is a 100% natural Ayurvedic solution for safe weight loss. "
+                   "Contains 39 herbs. Reduces hunger, promotes digestion. Over 60,000 users.")
+CACHE_PATH = os.path.join("cache", "website_summary.json")
+TTL_SECONDS = 6 * 60 * 60   # Serve cached copy without refreshing for 6 hours
+FETCH_TIMEOUT = 5           # Seconds (connect + read) before giving up on the website
+RETRY_SECONDS = 5 * 60      # After a failed fetch, wait this long before trying again
+MAX_CHARS = 1500            # Website text kept for prompts (it goes into every QA prompt)
+
+_lock = threading.Lock()
+_entries = {}       # url -> {"text": ..., "fetched_at": ...}
+_refreshing = set()  # urls with a background refresh in flight
+_failed_at = {}     # url -> time of the last failed fetch
+
+class _TextExtractor(HTMLParser):
+    """Visible page text plus the meta description; scripts, styles and page chrome are skipped."""
+    SKIP = {"script", "style", "noscript", "template", "svg", "head", "nav", "footer"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.description = ""
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta" and dict(attrs).get("name", "").lower() == "description":
+            self.description = dict(attrs).get("content") or ""
+        elif tag in self.SKIP:
+            self._skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping and data.strip():
+            self.parts.append(data.strip())
+
+def extract_text(html, max_chars=MAX_CHARS):
+    """Plain knowledge text from a web page: meta description first, then the visible text."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = re.sub(r"\s+", " ", " ".join([parser.description] + parser.parts)).strip()
+    return text[:max_chars].rsplit(" ", 1)[0] if len(text) > max_chars else text
+
+def _fetch(url, timeout):
+    """Fetch the website and return its knowledge text. Raises on any failure or an empty page."""
+    import requests
+    r = requests.get(url, timeout=timeout)
+    r.raise_for_status()
+    text = extract_text(r.text)
+    if not text:
+        raise ValueError("no text on the page")
+    return text
+
+def _load_disk(path):
+    """Return {url: entry} from the on-disk cache, or {} if missing/corrupt."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def _save_disk(path, url, entry):
+    """Write one entry to the on-disk cache atomically (tmp file + rename)."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        data = _load_disk(path)
+        data[url] = entry
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ Could not write website cache {path}: {e}")
+
+def refresh(url=WEBSITE_URL, path=CACHE_PATH, timeout=FETCH_TIMEOUT):
+    """Fetch now and update the cache. Keeps the last good copy if the fetch fails.
+    Returns True if the cache was updated."""
+    try:
+        text = _fetch(url, timeout)
+        entry = {"text": text, "fetched_at": time.time()}
+        with _lock:
+            _entries[url] = entry
+        _save_disk(path, url, entry)
+        with _lock:
+            _failed_at.pop(url, None)
+        return True
+    except Exception as e:
+        print(f"⚠️ Website fetch failed for {url}, using last good copy: {e}")
+        with _lock:
+            _failed_at[url] = time.time()
+        return False
+    finally:
+        with _lock:
+            _refreshing.discard(url)
+
+def _refresh_in_background(url, path, timeout):
+    with _lock:
+        if url in _refreshing or time.time() - _failed_at.get(url, 0) < RETRY_SECONDS:
+            return
+        _refreshing.add(url)
+    threading.Thread(target=refresh, args=(url, path, timeout), daemon=True).start()
+
+def get_website_summary(url=WEBSITE_URL, path=CACHE_PATH, ttl=TTL_SECONDS, timeout=FETCH_TIMEOUT):
+    """Return website knowledge text without ever blocking on the network.
+    Fresh copy: returned as is. Stale copy: returned immediately while a background
+    refresh runs (stale-while-revalidate). No copy at all (fresh deploy): the built-in
+    WEBSITE_SUMMARY is served as an already-stale copy, so the first call starts a refresh.
+    Failed refreshes are retried at most every RETRY_SECONDS."""
+    with _lock:
+        entry = _entries.get(url)
+    if entry is None:
+        entry = _load_disk(path).get(url) or {"text": WEBSITE_SUMMARY, "fetched_at": 0}
+        with _lock:
+            entry = _entries.setdefault(url, entry)
+    if time.time() - entry.get("fetched_at", 0) > ttl:
+        _refresh_in_background(url, path, timeout)
+    return entry.get("text", "")